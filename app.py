@@ -1,11 +1,22 @@
+import os
+import time
+
 import pandas as pd
-import numpy as np
 import streamlit as st
 
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
+from cuisine import batch, dataset, evaluation, geo, instrumentation, multilabel, pipeline, profile, text, training, tuning
+from cuisine.jobs import BackgroundTasks, ExtraTrees, TrainingJobs, save_model
+from cuisine.model_pool import ModelPool
+from cuisine.model_store import ModelStore
+
+# ---------------------------------
+# Instrumentation
+# ---------------------------------
+# Times each stage of this rerun; shown in the sidebar Performance panel and
+# exported as JSON log lines and Prometheus metrics.
+perf = instrumentation.Recorder()
+if os.environ.get("CUISINE_PERF_LOG"):
+    instrumentation.log_to_stderr()
 
 # ---------------------------------
 # Streamlit Page Config
@@ -600,15 +611,33 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+perf.lap("page_setup")
+
 # ---------------------------------
 # Load Dataset
 # ---------------------------------
-@st.cache_data
+# cache_resource hands every rerun the same (memory-mapped) frame instead of
+# unpickling a fresh copy; nothing below mutates it.
+@st.cache_resource
 def load_data():
-    df = pd.read_csv("Dataset.csv")
-    return df
+    instrumentation.cache_miss()
+    df = dataset.load_cached("Dataset.csv")
+    return df, pipeline.dataset_fingerprint(df)
+
+df, data_hash = load_data()
+perf.lap("load_data", cached=True)
 
-df = load_data()
+# Built once per dataset version and saved next to the Feather cache, so
+# Data Overview renders from small tables instead of scanning df.
+@st.cache_resource
+def load_profile(data_hash, _df):
+    instrumentation.cache_miss()
+    return profile.cached_profile("Dataset.csv", _df, data_hash)
+
+@st.fragment
+def histogram_panel(data_profile):
+    col = st.selectbox("Column", list(data_profile.histograms))
+    st.bar_chart(data_profile.histograms[col], x="Value", y="Count", sort=False)
 
 # ---------------------------------
 # Sidebar
@@ -617,6 +646,14 @@ with st.sidebar:
     st.markdown("## 🎛️ Model Settings")
     st.markdown("---")
     
+    model_type = st.radio(
+        "🤖 Model",
+        ["Random Forest", "Name n-grams + linear model"],
+        help="A forest over the tabular features, or logistic regression over hashed "
+             "Restaurant Name n-grams plus the same features"
+    )
+    name_features = model_type != "Random Forest"
+    
     n_estimators = st.slider(
         "🌲 Number of Trees",
         min_value=50,
@@ -626,6 +663,33 @@ with st.sidebar:
         help="Number of trees in the Random Forest"
     )
     
+    with st.expander("⚙️ Training Resources"):
+        cpu_count = os.cpu_count() or 1
+        n_jobs = st.number_input(
+            "🧵 CPU Cores (n_jobs)",
+            min_value=1,
+            max_value=cpu_count,
+            value=cpu_count,
+            help="Trees are built in parallel across this many cores"
+        )
+        
+        max_depth = st.slider(
+            "📏 Max Tree Depth",
+            min_value=0,
+            max_value=50,
+            value=0,
+            help="Cap on tree depth (0 = unlimited)"
+        )
+        
+        max_samples = st.slider(
+            "🎲 Max Samples per Tree",
+            min_value=0.1,
+            max_value=1.0,
+            value=1.0,
+            step=0.05,
+            help="Fraction of training rows bootstrapped for each tree"
+        )
+    
     test_size = st.slider(
         "📊 Test Size",
         min_value=0.1,
@@ -635,292 +699,608 @@ with st.sidebar:
         help="Proportion of dataset for testing"
     )
     
+    target_mode = st.radio(
+        "🎯 Prediction Target",
+        ["Cuisine combination", "Individual cuisines"],
+        help="Predict the full Cuisines string as one class, or each cuisine tag separately (multi-label)"
+    )
+    multilabel_target = target_mode == "Individual cuisines"
+    
+    geo_features = st.checkbox(
+        "📍 Neighbourhood features",
+        help="Share of common cuisines among each restaurant's nearest neighbours, "
+             "from Latitude/Longitude"
+    )
+    
     st.markdown("---")
     st.markdown("### 📋 Quick Stats")
     st.info(f"📁 **Dataset Size:** {len(df):,} rows")
     st.info(f"📊 **Features:** {df.shape[1]} columns")
+    
+    show_perf = st.toggle("⏱️ Performance panel", help="Per-stage timings of each rerun")
+
+perf.lap("sidebar")
 
 # ---------------------------------
 # Main Content Tabs
 # ---------------------------------
-tab1, tab2, tab3, tab4 = st.tabs([
+tab_labels = [
     "📊 Data Overview", 
     "🧠 Model Training", 
     "📈 Performance", 
-    "🔮 Predict"
-])
-
-# ---------------------------------
-# Data Preprocessing (happens in background)
-# ---------------------------------
-df_processed = df.copy()
-df_processed.fillna("Unknown", inplace=True)
-
-binary_cols = ["Has Online delivery", "Has Table booking"]
-for col in binary_cols:
-    if col in df_processed.columns:
-        df_processed[col] = df_processed[col].map({"Yes": 1, "No": 0})
+    "🔮 Predict",
+    "🧪 Tuning"
+]
 
-target_column = "Cuisines"
-le = LabelEncoder()
-df_processed[target_column] = le.fit_transform(df_processed[target_column])
+# With on_change="rerun" only the selected tab's body executes; older
+# Streamlit versions without lazy tabs render every tab as before.
+try:
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(tab_labels, key="active_tab", on_change="rerun")
+except TypeError:
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(tab_labels)
 
-features = []
-possible_features = [
-    "Average Cost for two",
-    "Price range",
-    "Has Online delivery",
-    "Has Table booking",
-    "Votes"
-]
+def is_open(tab):
+    return getattr(tab, "open", None) is not False
 
-for col in possible_features:
-    if col in df_processed.columns:
-        features.append(col)
+# ---------------------------------
+# Data Preprocessing (cached per dataset and split)
+# ---------------------------------
+@st.cache_resource
+def preprocess_data(data_hash, test_size, multilabel_target, name_features, geo_features, _df):
+    instrumentation.cache_miss()
+    return pipeline.preprocess(
+        _df, test_size, multilabel_target=multilabel_target,
+        name_features=name_features, geo_features=geo_features
+    )
 
-X = df_processed[features]
-y = df_processed[target_column]
+data = preprocess_data(data_hash, test_size, multilabel_target, name_features, geo_features, df)
+perf.lap("preprocess", cached=True)
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=test_size, random_state=42
-)
+features = data.features
+le = data.encoder
 
 # ---------------------------------
 # Tab 1: Data Overview
 # ---------------------------------
 with tab1:
-    st.markdown("""
-    <div class="section-header">
-        <h2>📊 Dataset Preview</h2>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Metrics row
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div class="metric-card">
-            <div class="metric-value">{:,}</div>
-            <div class="metric-label">Total Records</div>
-        </div>
-        """.format(len(df)), unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="metric-card">
-            <div class="metric-value">{}</div>
-            <div class="metric-label">Features Used</div>
-        </div>
-        """.format(len(features)), unsafe_allow_html=True)
-    
-    with col3:
-        unique_cuisines = df["Cuisines"].nunique() if "Cuisines" in df.columns else 0
-        st.markdown("""
-        <div class="metric-card">
-            <div class="metric-value">{:,}</div>
-            <div class="metric-label">Unique Cuisines</div>
-        </div>
-        """.format(unique_cuisines), unsafe_allow_html=True)
-    
-    with col4:
+    if is_open(tab1):
+        data_profile = load_profile(data_hash, df)
+        perf.lap("profile", cached=True)
+        
         st.markdown("""
-        <div class="metric-card">
-            <div class="metric-value">{}</div>
-            <div class="metric-label">Columns</div>
+        <div class="section-header">
+            <h2>📊 Dataset Preview</h2>
         </div>
-        """.format(df.shape[1]), unsafe_allow_html=True)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Data preview
-    st.markdown("""
-    <div class="info-card">
-        <div class="card-title">📋 Sample Data</div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.dataframe(df.head(10), use_container_width=True, height=400)
-    
-    # Data info columns
-    col1, col2 = st.columns(2)
-    
-    with col1:
+        """, unsafe_allow_html=True)
+        
+        # Metrics row
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.markdown("""
+            <div class="metric-card">
+                <div class="metric-value">{:,}</div>
+                <div class="metric-label">Total Records</div>
+            </div>
+            """.format(data_profile.n_rows), unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown("""
+            <div class="metric-card">
+                <div class="metric-value">{}</div>
+                <div class="metric-label">Features Used</div>
+            </div>
+            """.format(len(features)), unsafe_allow_html=True)
+        
+        with col3:
+            unique_cuisines = data_profile.distinct("Cuisines") if "Cuisines" in df.columns else 0
+            st.markdown("""
+            <div class="metric-card">
+                <div class="metric-value">{:,}</div>
+                <div class="metric-label">Unique Cuisines</div>
+            </div>
+            """.format(unique_cuisines), unsafe_allow_html=True)
+        
+        with col4:
+            st.markdown("""
+            <div class="metric-card">
+                <div class="metric-value">{}</div>
+                <div class="metric-label">Columns</div>
+            </div>
+            """.format(len(data_profile.columns)), unsafe_allow_html=True)
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        # Data preview
         st.markdown("""
         <div class="info-card">
-            <div class="card-title">📊 Data Types</div>
+            <div class="card-title">📋 Sample Data</div>
         </div>
         """, unsafe_allow_html=True)
         
-        dtype_df = pd.DataFrame({
-            'Column': df.dtypes.index,
-            'Type': df.dtypes.values.astype(str)
-        })
-        st.dataframe(dtype_df, use_container_width=True, hide_index=True)
-    
-    with col2:
+        st.dataframe(data_profile.head, use_container_width=True, height=400)
+        
+        # Data info columns
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("""
+            <div class="info-card">
+                <div class="card-title">📊 Data Types</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            dtype_df = data_profile.columns[["Column", "Type", "Categories", "Distinct (≈)"]]
+            st.dataframe(dtype_df, use_container_width=True, hide_index=True)
+        
+        with col2:
+            st.markdown("""
+            <div class="info-card">
+                <div class="card-title">🔢 Missing Values</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            missing_df = data_profile.columns[["Column", "Missing"]]
+            st.dataframe(missing_df, use_container_width=True, hide_index=True)
+        
         st.markdown("""
         <div class="info-card">
-            <div class="card-title">🔢 Missing Values</div>
+            <div class="card-title">📈 Value Distributions</div>
         </div>
         """, unsafe_allow_html=True)
         
-        missing_df = pd.DataFrame({
-            'Column': df.isnull().sum().index,
-            'Missing': df.isnull().sum().values
-        })
-        st.dataframe(missing_df, use_container_width=True, hide_index=True)
+        histogram_panel(data_profile)
+        if data_profile.sampled:
+            st.caption(
+                f"Profiled from a sample of {data_profile.sample_rows:,} of {data_profile.n_rows:,} rows; "
+                "counts are scaled to the full dataset and distinct counts are estimates."
+            )
+
+perf.lap("tab_overview")
 
 # ---------------------------------
 # Tab 2: Model Training
 # ---------------------------------
 with tab2:
-    st.markdown("""
-    <div class="section-header">
-        <h2>🧠 Model Training Process</h2>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Training steps
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
+    if is_open(tab2):
         st.markdown("""
-        <div class="info-card">
-            <div class="card-title">⚙️ Preprocessing Steps</div>
+        <div class="section-header">
+            <h2>🧠 Model Training Process</h2>
         </div>
         """, unsafe_allow_html=True)
         
-        st.markdown("""
-        ✅ **Step 1:** Handle missing values (filled with "Unknown")
+        # Training steps
+        col1, col2 = st.columns([1, 1])
         
-        ✅ **Step 2:** Encode binary columns (Yes/No → 1/0)
+        with col1:
+            st.markdown("""
+            <div class="info-card">
+                <div class="card-title">⚙️ Preprocessing Steps</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if data.multilabel:
+                target_step = "Split Cuisines into individual tags (multi-label)"
+            else:
+                target_step = "Label encode target variable (Cuisines)"
+            
+            st.markdown(f"""
+            ✅ **Step 1:** Handle missing values (filled with "Unknown")
+            
+            ✅ **Step 2:** Encode binary columns (Yes/No → 1/0)
+            
+            ✅ **Step 3:** {target_step}
+            
+            ✅ **Step 4:** Convert cost for two to US dollars; encode Country Code and City as category codes
+            
+            ✅ **Step 5:** Select features for training
+            """)
+            extra_steps = []
+            if data.geo_index is not None:
+                extra_steps.append(
+                    f"Share of common cuisines among the {data.geo_index.k} nearest training "
+                    "restaurants (KD-tree over Latitude/Longitude, leaving each restaurant out)"
+                )
+            if data.name_features:
+                extra_steps.append(
+                    "Hash Restaurant Name character and word n-grams and the features into sparse rows"
+                )
+            for step, description in enumerate(extra_steps, start=6):
+                st.markdown(f"✅ **Step {step}:** {description}")
+            
+            st.markdown("""
+            <div class="success-badge">
+                ✓ Preprocessing Complete
+            </div>
+            """, unsafe_allow_html=True)
         
-        ✅ **Step 3:** Label encode target variable (Cuisines)
+        with col2:
+            st.markdown("""
+            <div class="info-card">
+                <div class="card-title">🌲 Model Configuration</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if data.name_features:
+                model_rows = f"""| Algorithm | Logistic Regression (SGD) |
+            | Epochs | {training.LINEAR_EPOCHS} |
+            | Hashed Dimensions | {data.X.shape[1]:,} |"""
+            else:
+                model_rows = f"""| Algorithm | Random Forest |
+            | Number of Trees | {n_estimators} |
+            | Max Depth | {max_depth or "Unlimited"} |
+            | Max Samples | {max_samples:.0%} |"""
+            
+            st.markdown(f"""
+            | Parameter | Value |
+            |-----------|-------|
+            {model_rows}
+            | Target | {target_mode} |
+            | Test Size | {test_size:.0%} |
+            | CPU Cores | {n_jobs} |
+            | Random State | {pipeline.RANDOM_STATE} |
+            | Training Samples | {len(data.train_idx):,} |
+            | Testing Samples | {len(data.test_idx):,} |
+            """)
         
-        ✅ **Step 4:** Select numerical features for training
-        """)
+        st.markdown("<br>", unsafe_allow_html=True)
         
-        st.markdown("""
-        <div class="success-badge">
-            ✓ Preprocessing Complete
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
+        # Features used
         st.markdown("""
         <div class="info-card">
-            <div class="card-title">🌲 Model Configuration</div>
+            <div class="card-title">📋 Features Used for Training</div>
         </div>
         """, unsafe_allow_html=True)
         
-        st.markdown(f"""
-        | Parameter | Value |
-        |-----------|-------|
-        | Algorithm | Random Forest |
-        | Number of Trees | {n_estimators} |
-        | Test Size | {test_size:.0%} |
-        | Random State | 42 |
-        | Training Samples | {len(X_train):,} |
-        | Testing Samples | {len(X_test):,} |
-        """)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Features used
-    st.markdown("""
-    <div class="info-card">
-        <div class="card-title">📋 Features Used for Training</div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    feature_cols = st.columns(len(features))
-    for i, feature in enumerate(features):
-        with feature_cols[i]:
-            st.info(f"📊 {feature}")
+        # Neighbourhood features add a column per cuisine; wrap onto more rows.
+        feature_cols = st.columns(min(len(features), 7))
+        for i, feature in enumerate(features):
+            with feature_cols[i % len(feature_cols)]:
+                st.info(f"{'📍' if geo.is_nearby(feature) else '📊'} {feature}")
+
+perf.lap("tab_training")
 
 # ---------------------------------
-# Model Training (cached)
+# Model Training (cached in memory and on disk)
 # ---------------------------------
 @st.cache_resource
-def train_model(n_est, X_train_data, y_train_data):
-    model = RandomForestClassifier(n_estimators=n_est, random_state=42)
-    model.fit(X_train_data, y_train_data)
-    return model
+def get_model_store():
+    return ModelStore(
+        os.environ.get("CUISINE_MODEL_STORE", ".model_store"),
+        max_entries=int(os.environ.get("CUISINE_MODEL_STORE_SIZE", "8"))
+    )
+
+@st.cache_resource
+def get_training_jobs():
+    return TrainingJobs(max_workers=int(os.environ.get("CUISINE_TRAINING_WORKERS", "1")))
+
+# Fitted models and their test-set evaluation live in one pool shared by every
+# session, keyed on the model fingerprint, so a rerun never hashes the training
+# arrays or re-scores the test set. The pool is bounded by a RAM budget; models
+# evicted from it are reloaded from the on-disk store.
+@st.cache_resource
+def get_model_pool():
+    return ModelPool(max_bytes=int(os.environ.get("CUISINE_MODEL_POOL_MB", "1024")) * 2**20)
+
+# Key of the largest fitted forest per family (same data, split and parameters
+# except n_estimators), so moving the tree slider only fits or drops the difference.
+@st.cache_resource
+def get_forest_families():
+    return {}
+
+def remember_model(model_key, family_key, model, scores):
+    get_model_pool().put(model_key, (model, scores))
+    families = get_forest_families()
+    _, base_size = families.get(family_key, (None, 0))
+    n_trees = len(getattr(model, "estimators_", []))
+    if n_trees > base_size:
+        families[family_key] = (model_key, n_trees)
+
+def load_model(model_key, family_key, n_jobs, data):
+    """(model, scores) when the model is in memory, on disk or grown by a finished job, else None."""
+    pool = get_model_pool()
+    trained = pool.get(model_key)
+    if trained is not None:
+        model, scores = trained
+        return model.set_params(n_jobs=n_jobs), scores
+    instrumentation.cache_miss()
+    
+    jobs = get_training_jobs()
+    job = jobs.get(model_key)
+    if job is not None and job.done() and not job.exception() and isinstance(job.result(), ExtraTrees):
+        trained = merge_extra_trees(model_key, job.result(), data)
+        jobs.forget(model_key)
+        if trained is None:
+            return None
+        model, scores = trained
+    else:
+        entry = get_model_store().get(model_key)
+        if entry is None:
+            return None
+        model = entry["model"]
+        scores = entry.get("evaluation") or evaluation.evaluate(model, data)
+        jobs.forget(model_key)
+    
+    model.set_params(n_jobs=n_jobs)
+    remember_model(model_key, family_key, model, scores)
+    return model, scores
+
+def cached_model(key):
+    """(model, scores) of key from the pool or the store, else None."""
+    trained = get_model_pool().get(key)
+    if trained is not None:
+        return trained
+    entry = get_model_store().get(key)
+    if entry is None or entry.get("evaluation") is None:
+        return None
+    return entry["model"], entry["evaluation"]
+
+def merge_extra_trees(model_key, grown, data):
+    """The forest grown.base_key plus grown's trees, evaluated and saved under model_key."""
+    base = cached_model(grown.base_key)
+    if base is None:
+        return None
+    start = time.perf_counter()
+    base_model, _ = base
+    model = training.merge_forests(base_model, grown.model)
+    scores = evaluation.evaluate(model, data)
+    # Stored like a fresh fit, so it outlives the pool and can be grown or trimmed again.
+    save_model(model_key, get_model_store(), data, model, scores,
+               grown.fit_seconds + time.perf_counter() - start)
+    return model, scores
+
+def family_base(family_key):
+    """(key, (model, scores)) of the largest fitted forest of the family, else (None, None)."""
+    base_key, _ = get_forest_families().get(family_key, (None, 0))
+    if base_key is None:
+        return None, None
+    return base_key, cached_model(base_key)
+
+def start_training(model_key, family_key, n_est, n_jobs, max_depth, max_samples, data):
+    """Queue a background fit; identical requests from other sessions share one job.
+
+    With a larger forest of the family at hand, fewer trees are sliced off it
+    right here and None is returned; more trees only fit the extra ones in
+    the worker, and load_model merges them onto it.
+    """
+    base_key, base = family_base(family_key)
+    params = {"n_jobs": n_jobs, "max_depth": max_depth, "max_samples": max_samples}
+    if base is None:
+        return get_training_jobs().submit(model_key, get_model_store(), data, n_est, params)
+    
+    base_model, _ = base
+    n_base = len(base_model.estimators_)
+    if n_est <= n_base:
+        start = time.perf_counter()
+        model = training.resize_forest(base_model, data.X_train, data.y_train, n_est)
+        scores = evaluation.evaluate(model, data)
+        save_model(model_key, get_model_store(), data, model, scores, time.perf_counter() - start)
+        remember_model(model_key, family_key, model, scores)
+        return None
+    return get_training_jobs().submit(
+        model_key, get_model_store(), data, n_est, params, start=n_base, base_key=base_key
+    )
+
+def show_job_progress(slot, model_key):
+    done, total = get_training_jobs().progress_of(model_key)
+    status = get_training_jobs().status(model_key)
+    if status == "queued":
+        slot.progress(0.0, text="⏳ Training queued")
+    elif total:
+        slot.progress(done / total, text=f"🌲 Training trees: {done}/{total}")
 
-model = train_model(n_estimators, X_train, y_train)
-y_pred = model.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
+def wait_for_training(future, model_key):
+    with st.sidebar:
+        slot = st.empty()
+    while not future.done():
+        show_job_progress(slot, model_key)
+        time.sleep(0.25)
+    slot.empty()
+    if future.exception():
+        st.sidebar.error(f"❌ Training failed: {future.exception()}")
+        st.stop()
+
+# Polls a background job while an older model is on screen and reruns the
+# app once the new model is ready.
+@st.fragment(run_every=1.0)
+def training_status(model_key):
+    status = get_training_jobs().status(model_key)
+    if status in ("queued", "running"):
+        st.caption("Showing the previous model until the new one is ready.")
+        show_job_progress(st.empty(), model_key)
+    elif status == "failed":
+        st.error(f"❌ Training failed: {get_training_jobs().get(model_key).exception()}")
+    elif status == "done":
+        st.rerun()
+
+# n_jobs only changes speed, not the fitted trees, so it is not part of the key.
+if name_features:
+    # The tree settings do not apply, so moving them never refits the linear model.
+    params = {"model": "name-linear", "alpha": training.LINEAR_ALPHA, "epochs": training.LINEAR_EPOCHS}
+    model_trees = None
+else:
+    params = training.forest_params(max_depth=max_depth, max_samples=max_samples)
+    model_trees = n_estimators
+params["target"] = "multilabel" if multilabel_target else "combination"
+model_key = ModelStore.make_key(
+    data_hash, features, model_trees, test_size, pipeline.RANDOM_STATE, **params
+)
+family_key = ModelStore.make_key(
+    data_hash, features, None, test_size, pipeline.RANDOM_STATE, **params
+)
+if is_open(tab3) or is_open(tab4):
+    trained = load_model(model_key, family_key, n_jobs, data)
+    if trained is None:
+        future = start_training(
+            model_key, family_key, n_estimators, n_jobs, max_depth, max_samples, data
+        )
+        last_good = st.session_state.get("last_good_model")
+        if future is None:
+            trained = load_model(model_key, family_key, n_jobs, data)
+        elif last_good is None:
+            # Nothing to show yet: wait for the first model.
+            wait_for_training(future, model_key)
+            trained = load_model(model_key, family_key, n_jobs, data)
+        else:
+            with st.sidebar:
+                training_status(model_key)
+    
+    if trained is not None:
+        st.session_state["last_good_model"] = (*trained, data, model_key)
+    if "last_good_model" not in st.session_state:
+        # The finished job could not be loaded, e.g. the forest it grew was evicted meanwhile.
+        st.warning("⚠️ The trained model is no longer available; it will be retrained.")
+        st.button("🔁 Retrain")
+        st.stop()
+    # The model on screen may predate the current settings, so it carries its own data and key.
+    model, scores, model_data, shown_key = st.session_state["last_good_model"]
+    accuracy = scores.accuracy
+    perf.lap("model", cached=True)
+
+pool_stats = get_model_pool().stats()
+st.sidebar.caption(
+    f"🧠 Model pool: {pool_stats['entries']} models, "
+    f"{pool_stats['bytes'] / 2**20:,.0f} / {pool_stats['max_bytes'] / 2**20:,.0f} MB · "
+    f"{pool_stats['hits']} hits, {pool_stats['misses']} misses, {pool_stats['evictions']} evictions"
+)
 
 # ---------------------------------
 # Tab 3: Performance
 # ---------------------------------
-with tab3:
-    st.markdown("""
-    <div class="section-header">
-        <h2>📈 Model Performance Metrics</h2>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Accuracy display
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col2:
-        st.markdown(f"""
-        <div class="metric-card" style="border-top: 5px solid #00b894;">
-            <div class="metric-value" style="background: linear-gradient(135deg, #00b894 0%, #00cec9 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">
-                {accuracy:.1%}
-            </div>
-            <div class="metric-label">Model Accuracy</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Two columns for report and feature importance
-    col1, col2 = st.columns([1, 1])
+REPORT_SORT_COLUMNS = ["Support", "F1", "Precision", "Recall", "Cuisine"]
+REPORT_PAGE_SIZES = [25, 50, 100, 250]
+SCORE_COLUMN = st.column_config.ProgressColumn(format="%.3f", min_value=0.0, max_value=1.0)
+
+@st.cache_resource
+def get_background_tasks():
+    return BackgroundTasks(max_workers=1)
+
+# Paging and sorting only re-execute this fragment; the browser only ever
+# receives one page of classes, however many there are.
+@st.fragment
+def class_report_panel(scores):
+    st.dataframe(
+        scores.summary,
+        use_container_width=True,
+        hide_index=True,
+        column_config={"Precision": SCORE_COLUMN, "Recall": SCORE_COLUMN, "F1": SCORE_COLUMN},
+    )
     
+    table = scores.report_table
+    col1, col2, col3 = st.columns(3)
     with col1:
-        st.markdown("""
-        <div class="info-card">
-            <div class="card-title">📝 Classification Report</div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        report = classification_report(y_test, y_pred)
-        st.markdown(f"""
-        <div class="report-container">
-            <pre>{report}</pre>
-        </div>
-        """, unsafe_allow_html=True)
-    
+        sort_by = st.selectbox("Sort by", REPORT_SORT_COLUMNS)
     with col2:
+        page_size = st.selectbox("Top N", REPORT_PAGE_SIZES)
+    with col3:
+        n_pages = evaluation.page_count(len(table), page_size)
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1)
+    ascending = st.toggle("Ascending", value=False)
+    
+    st.dataframe(
+        evaluation.class_page(table, sort_by, page_size, page - 1, ascending),
+        use_container_width=True,
+        hide_index=True,
+        column_config={"Precision": SCORE_COLUMN, "Recall": SCORE_COLUMN, "F1": SCORE_COLUMN},
+    )
+    st.caption(f"{len(table):,} classes · page {min(page, n_pages)} of {n_pages}")
+
+# Reruns the app once the background permutation importance is ready.
+@st.fragment(run_every=1.0)
+def importance_status(task):
+    if task.done():
+        st.rerun()
+    st.caption("⏳ Computing permutation importance on the test set...")
+
+def importance_panel(model, data, key):
+    """Permutation importance, computed once per model on a background thread."""
+    task = get_background_tasks().submit(
+        f"importance:{key}", evaluation.permutation_importance, model, data
+    )
+    if not task.done():
+        importance_status(task)
+    elif task.exception():
+        st.error(f"❌ Permutation importance failed: {task.exception()}")
+    else:
+        importance_df = task.result()
+        st.dataframe(
+            importance_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Importance": st.column_config.NumberColumn(
+                    format="%.4f", help="Drop in test accuracy when the feature is shuffled"
+                ),
+                "Std": st.column_config.NumberColumn(format="%.4f"),
+            },
+        )
+        st.bar_chart(importance_df.set_index("Feature")["Importance"], color="#FF6B6B")
+    
+    if hasattr(model, "feature_importances_"):
+        with st.expander("🌲 Impurity importance (from the forest's splits)"):
+            st.dataframe(
+                pd.DataFrame({
+                    "Feature": data.features,
+                    "Importance": model.feature_importances_,
+                }).sort_values("Importance", ascending=False, ignore_index=True),
+                use_container_width=True,
+                hide_index=True,
+                column_config={"Importance": st.column_config.NumberColumn(format="%.4f")},
+            )
+
+with tab3:
+    if is_open(tab3):
         st.markdown("""
-        <div class="info-card">
-            <div class="card-title">⭐ Feature Importance</div>
+        <div class="section-header">
+            <h2>📈 Model Performance Metrics</h2>
         </div>
         """, unsafe_allow_html=True)
         
-        importance_df = pd.DataFrame({
-            "Feature": features,
-            "Importance": model.feature_importances_
-        }).sort_values(by="Importance", ascending=False)
+        # Accuracy display
+        col1, col2, col3 = st.columns([1, 2, 1])
         
-        for _, row in importance_df.iterrows():
+        with col2:
             st.markdown(f"""
-            <div class="feature-item">
-                <span class="feature-name">{row['Feature']}</span>
-                <span class="feature-score">{row['Importance']:.3f}</span>
+            <div class="metric-card" style="border-top: 5px solid #00b894;">
+                <div class="metric-value" style="background: linear-gradient(135deg, #00b894 0%, #00cec9 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">
+                    {accuracy:.1%}
+                </div>
+                <div class="metric-label">Model Accuracy</div>
             </div>
             """, unsafe_allow_html=True)
         
         st.markdown("<br>", unsafe_allow_html=True)
-        st.bar_chart(importance_df.set_index("Feature"), color="#FF6B6B")
+        
+        # Two columns for report and feature importance
+        col1, col2 = st.columns([1, 1])
+        
+        with col1:
+            st.markdown("""
+            <div class="info-card">
+                <div class="card-title">📝 Classification Report</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            class_report_panel(scores)
+        
+        with col2:
+            st.markdown("""
+            <div class="info-card">
+                <div class="card-title">⭐ Feature Importance</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            importance_panel(model, model_data, shown_key)
+
+perf.lap("tab_performance")
 
 # ---------------------------------
 # Tab 4: Prediction
 # ---------------------------------
-with tab4:
+# Reruns triggered by the form only re-execute this fragment.
+@st.fragment
+def prediction_panel(model, le, data):
+    features = data.features
     st.markdown("""
     <div class="section-header">
         <h2>🔮 Predict Cuisine</h2>
@@ -937,32 +1317,76 @@ with tab4:
     with st.form("prediction_form"):
         input_data = {}
         
+        if data.name_features:
+            input_data[text.NAME_COLUMN] = st.text_input(
+                f"🏷️ {text.NAME_COLUMN}",
+                placeholder="e.g. Izakaya Kikufuji",
+                help="Character and word n-grams of the name are matched against known restaurants"
+            )
+        
         col1, col2 = st.columns(2)
         
-        for i, col in enumerate(features):
+        # Neighbourhood features are looked up from the location instead of typed in.
+        if data.geo_index is not None:
+            center = dict(zip([geo.LATITUDE_COLUMN, geo.LONGITUDE_COLUMN], data.geo_index.center))
+            with col1:
+                input_data[geo.LATITUDE_COLUMN] = st.number_input(
+                    f"🌐 {geo.LATITUDE_COLUMN}", min_value=-90.0, max_value=90.0,
+                    value=center[geo.LATITUDE_COLUMN], format="%.6f"
+                )
+            with col2:
+                input_data[geo.LONGITUDE_COLUMN] = st.number_input(
+                    f"🌐 {geo.LONGITUDE_COLUMN}", min_value=-180.0, max_value=180.0,
+                    value=center[geo.LONGITUDE_COLUMN], format="%.6f"
+                )
+        
+        form_features = [col for col in features if not geo.is_nearby(col)]
+        for i, col in enumerate(form_features):
             with col1 if i % 2 == 0 else col2:
-                if df_processed[col].dtype in [int, float, np.int64, np.float64]:
-                    min_val = float(df_processed[col].min())
-                    max_val = float(df_processed[col].max())
-                    mean_val = float(df_processed[col].mean())
-                    
-                    # Custom labels with emojis
-                    emoji_map = {
-                        "Average Cost for two": "💰",
-                        "Price range": "📊",
-                        "Has Online delivery": "🚚",
-                        "Has Table booking": "📅",
-                        "Votes": "👍"
-                    }
-                    emoji = emoji_map.get(col, "📌")
-                    
-                    input_data[col] = st.number_input(
-                        f"{emoji} {col}",
-                        min_value=min_val,
-                        max_value=max_val,
-                        value=mean_val,
-                        help=f"Range: {min_val:.0f} - {max_val:.0f}"
+                stats = data.feature_stats[col]
+                if col in data.vocabularies:
+                    options = list(data.vocabularies[col])
+                    input_data[col] = st.selectbox(
+                        f"📍 {col}",
+                        options,
+                        index=options.index(stats["mode"])
                     )
+                    continue
+                min_val = stats["min"]
+                max_val = stats["max"]
+                mean_val = stats["mean"]
+                
+                # Custom labels with emojis
+                emoji_map = {
+                    "Average Cost for two": "💰",
+                    "Cost for two (USD)": "💵",
+                    "Price range": "📊",
+                    "Has Online delivery": "🚚",
+                    "Has Table booking": "📅",
+                    "Votes": "👍"
+                }
+                emoji = emoji_map.get(col, "📌")
+                
+                input_data[col] = st.number_input(
+                    f"{emoji} {col}",
+                    min_value=min_val,
+                    max_value=max_val,
+                    value=mean_val,
+                    help=f"Range: {min_val:.0f} - {max_val:.0f}"
+                )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            top_k = st.slider("🏅 Top Cuisines Shown", min_value=1, max_value=10, value=multilabel.DEFAULT_TOP_K)
+        with col2:
+            min_confidence = st.slider(
+                "🤔 Minimum Confidence",
+                min_value=0.0,
+                max_value=1.0,
+                value=0.0,
+                step=0.05,
+                help="Abstain instead of guessing when the best probability is below this (0 = always predict)"
+            )
         
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -971,18 +1395,137 @@ with tab4:
             submit = st.form_submit_button("🔮 Predict Cuisine", use_container_width=True)
     
     if submit:
-        input_df = pd.DataFrame([input_data])
-        prediction = model.predict(input_df)
-        predicted_cuisine = le.inverse_transform(prediction)[0]
-        
-        st.markdown(f"""
-        <div class="prediction-result">
-            <h3>🎉 Prediction Result</h3>
-            <p class="cuisine-name">🍽️ {predicted_cuisine}</p>
+        input_row = pipeline.model_inputs(
+            pd.DataFrame([input_data]), features, data.vocabularies, data.name_features, data.geo_index
+        )
+        # The same columns the batch and HTTP tools produce, for a single row.
+        columns = batch.prediction_columns(model, le, input_row, top_k, min_confidence or None)
+        predicted_cuisine = columns[batch.PREDICTION_COLUMN][0]
+        ranks = [i + 1 for i in range(top_k) if batch.TOP_LABEL_COLUMN.format(i + 1) in columns]
+        labels = [columns[batch.TOP_LABEL_COLUMN.format(i)][0] for i in ranks]
+        proba = [columns[batch.TOP_PROBABILITY_COLUMN.format(i)][0] for i in ranks]
+        
+        if predicted_cuisine is None:
+            st.markdown(f"""
+            <div class="prediction-result">
+                <h3>🤔 Not Confident Enough</h3>
+                <p class="cuisine-name">Best guess: {labels[0]} ({proba[0]:.0%})</p>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+            <div class="prediction-result">
+                <h3>🎉 Prediction Result</h3>
+                <p class="cuisine-name">🍽️ {predicted_cuisine}</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            st.balloons()
+        
+        st.dataframe(
+            pd.DataFrame({"Cuisine": labels, "Probability": proba}),
+            use_container_width=True,
+            hide_index=True,
+            column_config={"Probability": SCORE_COLUMN},
+        )
+
+with tab4:
+    if is_open(tab4):
+        prediction_panel(model, model_data.encoder, model_data)
+
+perf.lap("tab_predict")
+
+# ---------------------------------
+# Tab 5: Hyperparameter Tuning
+# ---------------------------------
+MAX_FEATURES_OPTIONS = {"sqrt": "sqrt", "log2": "log2", "all": None}
+
+def run_sweep(configs, n_folds, halving):
+    """Cross-validate configs in worker processes; fold scores are cached next to the models."""
+    sweep = tuning.Sweep(
+        data.X, data.y, data_hash, features,
+        target="multilabel" if multilabel_target else "combination",
+        n_folds=n_folds,
+        cache=tuning.ScoreCache(os.path.join(get_model_store().root, "sweep_scores.json")),
+        max_workers=int(os.environ.get("CUISINE_TUNING_WORKERS", 0)) or None,
+    )
+    bar = st.progress(0.0, text="🔬 Cross-validating...")
+    
+    def progress(rung, done, total):
+        bar.progress(done / total, text=f"🔬 Round {rung + 1}: {done}/{total} fold fits")
+    
+    board = sweep.run(configs, halving=halving, progress=progress)
+    bar.empty()
+    if sweep.failures:
+        _, _, exc = sweep.failures[0]
+        st.error(
+            f"❌ {len(sweep.failures)} fold fits failed ({type(exc).__name__}: {exc}). "
+            "A worker that dies is usually out of memory: cap the depth, use fewer trees "
+            "or set CUISINE_TUNING_WORKERS lower."
+        )
+    return board
+
+with tab5:
+    if is_open(tab5):
+        st.markdown("""
+        <div class="section-header">
+            <h2>🧪 Hyperparameter Tuning</h2>
         </div>
         """, unsafe_allow_html=True)
         
-        st.balloons()
+        if data.name_features:
+            st.info("ℹ️ Sweeps tune the Random Forest; switch the model in the sidebar to run one.")
+        else:
+            with st.form("tuning_form"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    tree_grid = st.multiselect("🌲 Number of Trees", [50, 100, 200, 300, 500], default=[50, 100, 200])
+                    depth_grid = st.multiselect("📏 Max Depth (0 = unlimited)", [0, 10, 20, 30], default=[10, 20])
+                    feature_grid = st.multiselect("🎲 Max Features", list(MAX_FEATURES_OPTIONS), default=["sqrt", "all"])
+                    size_grid = st.multiselect("📊 Test Size", [0.1, 0.2, 0.3, 0.4], default=[0.2])
+                with col2:
+                    search = st.radio("🔎 Search", ["Grid", "Random"], horizontal=True)
+                    n_iter = st.number_input("Random samples", min_value=1, max_value=200, value=10)
+                    n_folds = st.slider("📂 CV Folds", min_value=2, max_value=10, value=tuning.DEFAULT_FOLDS)
+                    halving = st.checkbox("✂️ Successive halving", value=True,
+                                          help="Score everything on one fold, then give only the best third more folds")
+                submitted = st.form_submit_button("🚀 Run Sweep", use_container_width=True)
+        
+            if submitted:
+                space = {
+                    "n_estimators": tree_grid,
+                    "max_depth": depth_grid,
+                    "max_features": [MAX_FEATURES_OPTIONS[name] for name in feature_grid],
+                    "test_size": size_grid,
+                }
+                if not all(space.values()):
+                    st.warning("⚠️ Pick at least one value for every hyperparameter.")
+                else:
+                    if search == "Grid":
+                        configs = tuning.grid_configs(space)
+                    else:
+                        configs = tuning.random_configs(space, int(n_iter))
+                    st.session_state["sweep_leaderboard"] = run_sweep(configs, n_folds, halving)
+        
+            board = st.session_state.get("sweep_leaderboard")
+            if board is not None and len(board):
+                best = board.iloc[0]
+                best_depth = "unlimited" if pd.isna(best["max_depth"]) else int(best["max_depth"])
+                st.success(
+                    f"🏆 Best: {best['n_estimators']} trees, max depth {best_depth}, "
+                    f"max features {best['max_features'] or 'all'}, test size {best['test_size']:.0%} "
+                    f"— CV accuracy {best['CV Accuracy']:.2%}"
+                )
+                st.dataframe(
+                    board.assign(max_features=board["max_features"].fillna("all")),
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "CV Accuracy": st.column_config.NumberColumn(format="%.4f"),
+                        "Std": st.column_config.NumberColumn(format="%.4f"),
+                        "Fit Seconds": st.column_config.NumberColumn(format="%.1f"),
+                    },
+                )
 
 # ---------------------------------
 # Footer
@@ -990,3 +1533,32 @@ with tab4:
 st.markdown("""
 
 """, unsafe_allow_html=True)
+perf.lap("tab_tuning")
+
+# ---------------------------------
+# Performance Panel
+# ---------------------------------
+for name, kind, help_text in [
+    ("entries", "gauge", "Models held in the in-memory pool."),
+    ("bytes", "gauge", "Estimated bytes held by the model pool."),
+    ("hits", "counter", "Model pool lookups that found the model."),
+    ("misses", "counter", "Model pool lookups that missed."),
+    ("evictions", "counter", "Models evicted from the pool to stay within budget."),
+]:
+    suffix = "_total" if kind == "counter" else ""
+    instrumentation.REGISTRY.set_value(f"cuisine_model_pool_{name}{suffix}", pool_stats[name], help_text, kind)
+
+rerun = perf.finish(metrics_path=os.environ.get("CUISINE_METRICS_FILE"))
+
+if show_perf:
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.metric("Rerun", f"{rerun['total_seconds'] * 1000:,.0f} ms")
+        st.dataframe(
+            perf.frame(),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "ms": st.column_config.NumberColumn(format="%.1f"),
+                "ΔMB": st.column_config.NumberColumn(format="%+.1f"),
+            },
+        )
@@ -0,0 +1,76 @@
+"""Size and predict speed of the compact forest against the sklearn model.
+
+Fits one forest on the dataset's training split, compacts it, and compares
+pickled size, batch predict time, single-row predict time and how often the
+two agree on the predicted cuisine.
+
+    python -m benchmarks.compact_forest --n-estimators 50 --train-rows 5000
+"""
+import argparse
+import json
+import pickle
+import time
+
+from cuisine import compact, dataset, pipeline, training
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="Dataset.csv")
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--train-rows", type=int, default=None,
+                        help="fit on the first N training rows (the full split needs a lot of RAM)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--top-k", type=int, default=compact.DEFAULT_TOP_K)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    data = pipeline.preprocess(dataset.load_dataset(args.csv), args.test_size)
+    X_train, y_train = data.X_train[:args.train_rows], data.y_train[:args.train_rows]
+    X_test = data.X_test
+
+    model = training.fit_forest(X_train, y_train, args.n_estimators)
+    start = time.perf_counter()
+    compacted = compact.compact_forest(model, top_k=args.top_k)
+    compact_seconds = time.perf_counter() - start
+
+    sizes = {
+        "sklearn": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        "compact": len(pickle.dumps(compacted, protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+    batch = {name: best_time(lambda m=m: m.predict(X_test), args.repeat)
+             for name, m in (("sklearn", model), ("compact", compacted))}
+    row = X_test[:1]
+    single = {name: best_time(lambda m=m: m.predict(row), args.repeat * 10)
+              for name, m in (("sklearn", model), ("compact", compacted))}
+    agreement = float((model.predict(X_test) == compacted.predict(X_test)).mean())
+
+    result = {
+        "n_estimators": args.n_estimators,
+        "train_rows": len(y_train),
+        "test_rows": len(X_test),
+        "n_classes": len(model.classes_),
+        "top_k": args.top_k,
+        "compact_seconds": round(compact_seconds, 3),
+        "pickle_mb": {name: round(size / 1e6, 2) for name, size in sizes.items()},
+        "size_ratio": round(sizes["sklearn"] / sizes["compact"], 1),
+        "batch_predict_ms": {name: round(t * 1000, 2) for name, t in batch.items()},
+        "batch_speedup": round(batch["sklearn"] / batch["compact"], 2),
+        "single_row_ms": {name: round(t * 1000, 3) for name, t in single.items()},
+        "single_row_speedup": round(single["sklearn"] / single["compact"], 2),
+        "agreement": round(agreement, 4),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Wall time, peak RSS and throughput of each pipeline stage at growing data sizes.
+
+Runs the app's stages headlessly on Dataset.csv tiled 1x, 10x, 100x, ...:
+load_data (cold and from the Feather cache), preprocessing, the
+train/test split, training, batch predict, classification_report and the
+Predict form's single-row prediction. The JSON output carries library
+versions and the git revision, so runs of different versions can be diffed.
+
+    python -m benchmarks.pipeline_stages --scales 1 10 100 --output bench.json
+    python -m benchmarks.pipeline_stages --scales 10 100 --synthetic
+
+Forests over ~1.8k cuisine combinations grow very large; the default depth
+cap keeps the 100x training stage within a few GB.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
+
+from cuisine import batch, dataset, pipeline, synthetic, training
+from cuisine.instrumentation import current_rss
+
+STAGES = [
+    "load_data",
+    "load_data_cached",
+    "preprocess",
+    "train_test_split",
+    "train_model",
+    "predict",
+    "classification_report",
+    "single_row_predict",
+]
+
+
+# ---------------------------------
+# Measurement
+# ---------------------------------
+class RssSampler:
+    """Peak RSS while the block runs, sampled from a background thread.
+
+    Without /proc the process-lifetime peak from getrusage is reported instead.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = self.peak = current_rss()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        if self.start is not None:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is None:
+            # ru_maxrss is in KiB on Linux and bytes on macOS.
+            scale = 1 if sys.platform == "darwin" else 1024
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def measure(fn, items):
+    """Run fn once; returns (result, stats) with items processed per second.
+
+    items may be a function of the result when the count is only known afterwards.
+    """
+    gc.collect()
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+    if callable(items):
+        items = items(result)
+    stats = {
+        "seconds": round(seconds, 4),
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+        "rss_delta_mb": None if rss.start is None else round((rss.peak - rss.start) / 2**20, 1),
+        "items": items,
+        "items_per_second": round(items / seconds, 1) if seconds else None,
+    }
+    return result, stats
+
+
+# ---------------------------------
+# Synthetic scaling
+# ---------------------------------
+def scaled_csv(src, scale, folder, generate=False):
+    """src with its data rows repeated scale times, written once and reused.
+
+    With generate, the rows are synthetic restaurants drawn from src's
+    distributions instead of copies. Scale 1 is a copy too: the benchmark
+    deletes the Feather cache of the CSV it loads, which must not be the app's.
+    """
+    dst = os.path.join(folder, f"Dataset.{'synthetic' if generate else 'x'}{scale}.csv")
+    if os.path.exists(dst):
+        return dst
+    if generate:
+        rows = scale * len(pd.read_csv(src, usecols=[0]))
+        synthetic.write_synthetic(src, dst, rows)
+        return dst
+    with open(src, "rb") as fh:
+        header = fh.readline()
+        body = fh.read()
+    if not body.endswith(b"\n"):
+        body += b"\n"
+    tmp_path = dst + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(header)
+        for _ in range(scale):
+            fh.write(body)
+    os.replace(tmp_path, dst)
+    return dst
+
+
+def remove_cache(path):
+    try:
+        os.unlink(dataset.cache_path(path, dataset.DEFAULT_COLUMNS))
+    except FileNotFoundError:
+        pass
+
+
+# ---------------------------------
+# Stages
+# ---------------------------------
+def form_record(data):
+    """What the Predict form submits by default: numbers at their mean, categories at their mode."""
+    return {
+        col: stats["mode"] if col in data.vocabularies else stats["mean"]
+        for col, stats in data.feature_stats.items()
+    }
+
+
+def predict_one(model, data, record):
+    X = pipeline.encode_features(pd.DataFrame([record], columns=data.features), data.features, data.vocabularies)
+    return model.predict_proba(X)
+
+
+def predict_chunked(model, X, chunksize):
+    """model.predict in row chunks, as cuisine.batch does.
+
+    A single call holds a dense rows x classes probability matrix, which does
+    not fit in memory at 100x.
+    """
+    return np.concatenate([model.predict(X[start:start + chunksize])
+                           for start in range(0, len(X), chunksize)])
+
+
+def run_scale(path, args):
+    stages = {}
+
+    def load():
+        df = dataset.load_cached(path)
+        return df, pipeline.dataset_fingerprint(df)
+
+    remove_cache(path)
+    (df, _), stages["load_data"] = measure(load, lambda loaded: len(loaded[0]))
+    rows = len(df)
+    del df
+    (df, _), stages["load_data_cached"] = measure(load, rows)
+
+    data, stages["preprocess"] = measure(lambda: pipeline.preprocess(df, args.test_size), rows)
+    _, stages["train_test_split"] = measure(
+        lambda: train_test_split(np.arange(rows), test_size=args.test_size, random_state=pipeline.RANDOM_STATE),
+        rows,
+    )
+
+    X_train, y_train = data.X_train, data.y_train
+    X_test, y_test = data.X_test, data.y_test
+    model, stages["train_model"] = measure(
+        lambda: training.fit_forest(
+            X_train, y_train, args.n_estimators,
+            n_jobs=args.n_jobs, max_depth=args.max_depth, max_samples=args.max_samples,
+        ),
+        len(y_train),
+    )
+    y_pred, stages["predict"] = measure(
+        lambda: predict_chunked(model, X_test, args.predict_chunksize), len(X_test)
+    )
+    _, stages["classification_report"] = measure(
+        lambda: classification_report(y_test, y_pred, zero_division=0), len(y_test)
+    )
+
+    record = form_record(data)
+
+    def single_rows():
+        for _ in range(args.single_repeats):
+            predict_one(model, data, record)
+
+    _, stages["single_row_predict"] = measure(single_rows, args.single_repeats)
+    stages["single_row_predict"]["ms_per_row"] = round(
+        stages["single_row_predict"]["seconds"] * 1000 / args.single_repeats, 3
+    )
+    if not args.keep_cache:
+        remove_cache(path)
+    return {"rows": rows, "stages": stages}
+
+
+# ---------------------------------
+# Report
+# ---------------------------------
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def print_summary(results, stream=sys.stderr):
+    for result in results:
+        print(f"x{result['scale']} ({result['rows']:,} rows)", file=stream)
+        for name in STAGES:
+            stats = result["stages"][name]
+            print(f"  {name:<22} {stats['seconds']:>10.3f} s  {stats['peak_rss_mb']:>9.1f} MB peak  "
+                  f"{stats['items_per_second'] or 0:>14,.0f} /s", file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="Dataset.csv")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    parser.add_argument("--max-depth", type=int, default=12, help="0 for unlimited")
+    parser.add_argument("--max-samples", type=float, default=1.0)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--predict-chunksize", type=int, default=batch.DEFAULT_CHUNKSIZE)
+    parser.add_argument("--single-repeats", type=int, default=200)
+    parser.add_argument("--synthetic", action="store_true",
+                        help="scale with generated restaurants instead of repeated copies")
+    parser.add_argument("--work-dir", help="keep the scaled CSVs here (default: a temporary directory)")
+    parser.add_argument("--keep-cache", action="store_true", help="leave the Feather caches behind")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="cuisine-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        results = []
+        for scale in args.scales:
+            path = scaled_csv(args.csv, scale, work_dir, generate=args.synthetic)
+            results.append({"scale": scale, **run_scale(path, args)})
+            gc.collect()
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_summary(results)
+    report = {
+        "environment": environment(),
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key not in ("csv", "work_dir", "output", "keep_cache")
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
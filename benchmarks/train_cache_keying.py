@@ -0,0 +1,95 @@
+"""Rerun overhead of the cached train_model call, data-keyed vs fingerprint-keyed.
+
+Every Streamlit rerun calls train_model and pays for hashing its arguments
+even on a cache hit. This times that hit path with Streamlit's real cache
+decorator for growing training sets.
+
+    python -m benchmarks.train_cache_keying --rows 10000 100000 1000000
+"""
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cuisine import pipeline
+from cuisine.model_store import ModelStore
+
+
+@st.cache_resource
+def train_model_by_data(n_est, X_train_data, y_train_data):
+    return object()
+
+
+@st.cache_resource
+def train_model_by_key(model_key, n_est, _data):
+    return object()
+
+
+def scaled_data(base, rows, test_size):
+    reps = -(-rows // len(base.y))
+    X = np.tile(base.X, (reps, 1))[:rows]
+    y = np.tile(base.y, reps)[:rows]
+    split = int(rows * (1 - test_size))
+    order = np.random.default_rng(pipeline.RANDOM_STATE).permutation(rows)
+    return pipeline.Preprocessed(
+        features=base.features,
+        X=X,
+        y=y,
+        encoder=base.encoder,
+        train_idx=order[:split],
+        test_idx=order[split:],
+    )
+
+
+def time_hits(fn, args, repeat):
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default="Dataset.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    # Cached functions called outside `streamlit run` warn on every call.
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    base = pipeline.preprocess(pd.read_csv(args.csv), args.test_size)
+
+    results = []
+    for rows in args.rows:
+        data = scaled_data(base, rows, args.test_size)
+        X_train, y_train = data.X_train, data.y_train
+        model_key = ModelStore.make_key(
+            f"bench-{rows}", data.features, args.n_estimators,
+            args.test_size, pipeline.RANDOM_STATE
+        )
+
+        before = time_hits(train_model_by_data, (args.n_estimators, X_train, y_train), args.repeat)
+        after = time_hits(train_model_by_key, (model_key, args.n_estimators, data), args.repeat)
+        results.append({
+            "rows": rows,
+            "data_keyed_ms": round(before * 1000, 3),
+            "fingerprint_keyed_ms": round(after * 1000, 3),
+        })
+        print(f"{rows:>12,} rows  data-keyed {before * 1000:9.3f} ms  "
+              f"fingerprint-keyed {after * 1000:9.3f} ms")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Streamlit-free building blocks shared by app.py and the headless tools."""
@@ -0,0 +1,213 @@
+"""Headless batch prediction with the same preprocessing as app.py.
+
+    python -m cuisine.batch restaurants.csv predictions.csv
+    python -m cuisine.batch restaurants.parquet predictions.parquet --key <model key>
+    python -m cuisine.batch restaurants.csv predictions.csv --top-k 3 --min-confidence 0.2
+
+The model comes from the on-disk model store the app writes to; by default
+the most recently used entry is taken. --top-k adds the k likeliest cuisines
+and their probabilities; rows whose best probability is under
+--min-confidence are left without a prediction.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from cuisine import dataset, multilabel, pipeline
+from cuisine.model_store import ModelStore
+
+DEFAULT_CHUNKSIZE = 20_000
+ID_COLUMN = "Restaurant ID"
+PREDICTION_COLUMN = "Predicted Cuisine"
+TOP_LABEL_COLUMN = "Cuisine {}"
+TOP_PROBABILITY_COLUMN = "Probability {}"
+
+
+# ---------------------------------
+# Reading
+# ---------------------------------
+def is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def iter_chunks(path, columns, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrames of at most chunksize rows holding only the wanted columns."""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        wanted = [col for col in columns if col in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=wanted):
+            yield batch.to_pandas()
+    else:
+        yield from dataset.iter_dataset(path, columns, chunksize=chunksize)
+
+
+# ---------------------------------
+# Prediction
+# ---------------------------------
+def top_k_labels(model, encoder, X, k=multilabel.DEFAULT_TOP_K):
+    """Decoded labels and probabilities of the k likeliest classes of every row of X, best first.
+
+    predict_proba is partitioned rather than sorted, so thousands of classes
+    cost one pass per row. Multi-label models rank cuisine tags instead.
+    """
+    if isinstance(encoder, MultiLabelBinarizer):
+        return multilabel.predict_tags(model, encoder, X, k)
+    idx, proba = multilabel.top_k(model.predict_proba(X), k)
+    # The model only knows the classes it was fitted on, as encoded labels.
+    return encoder.classes_[np.asarray(model.classes_)[idx]], proba
+
+
+def prediction_columns(model, encoder, X, top_k=0, min_confidence=None):
+    """PREDICTION_COLUMN for every row of X, plus the top_k labels and probabilities.
+
+    Rows whose best probability is under min_confidence get no prediction
+    (None). Multi-label models predict every tag over multilabel.TAG_THRESHOLD
+    (or their best tag), joined into one string, which is also what the
+    evaluation scores. The app and the HTTP server call this too, so every
+    surface predicts the same thing.
+    """
+    is_multilabel = isinstance(encoder, MultiLabelBinarizer)
+    if not (is_multilabel or top_k or min_confidence is not None):
+        return {PREDICTION_COLUMN: encoder.classes_[model.predict(X)]}
+
+    if is_multilabel:
+        scores = multilabel.tag_scores(model, X)
+        above = int((scores > multilabel.TAG_THRESHOLD).sum(axis=1).max(initial=0))
+        idx, proba = multilabel.top_k(scores, max(top_k, above, 1))
+        labels = encoder.classes_[idx]
+        predicted = multilabel.predicted_tags(labels, proba)
+    else:
+        labels, proba = top_k_labels(model, encoder, X, max(top_k, 1))
+        predicted = labels[:, 0].astype(object)
+    if min_confidence is not None:
+        predicted[proba[:, 0] < min_confidence] = None
+
+    columns = {PREDICTION_COLUMN: predicted}
+    for i in range(min(top_k, labels.shape[1])):
+        columns[TOP_LABEL_COLUMN.format(i + 1)] = labels[:, i]
+        columns[TOP_PROBABILITY_COLUMN.format(i + 1)] = proba[:, i]
+    return columns
+
+
+def predict_labels(model, encoder, features, df, vocabularies=None, name_features=False,
+                   geo_index=None, min_confidence=None):
+    """Decoded cuisine label for every row of df, in one vectorized call.
+
+    Multi-label models yield their top cuisines joined into one string.
+    """
+    X = pipeline.model_inputs(df, features, vocabularies, name_features, geo_index)
+    return prediction_columns(model, encoder, X, min_confidence=min_confidence)[PREDICTION_COLUMN]
+
+
+def predict_chunks(chunks, model, encoder, features, vocabularies=None, name_features=False,
+                   geo_index=None, top_k=0, min_confidence=None):
+    for chunk in chunks:
+        out = pd.DataFrame(index=np.arange(len(chunk)))
+        if ID_COLUMN in chunk.columns:
+            out[ID_COLUMN] = chunk[ID_COLUMN].to_numpy()
+        X = pipeline.model_inputs(chunk, features, vocabularies, name_features, geo_index)
+        for col, values in prediction_columns(model, encoder, X, top_k, min_confidence).items():
+            out[col] = values
+        yield out
+
+
+# ---------------------------------
+# Writing
+# ---------------------------------
+def write_chunks(frames, path):
+    """Stream frames to CSV or Parquet; returns the number of rows written."""
+    rows = 0
+    if is_parquet(path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        header = True
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            for frame in frames:
+                frame.to_csv(fh, index=False, header=header)
+                header = False
+                rows += len(frame)
+    return rows
+
+
+def predict_file(src, dst, model, encoder, features, chunksize=DEFAULT_CHUNKSIZE, vocabularies=None,
+                 name_features=False, geo_index=None, top_k=0, min_confidence=None):
+    columns = set(pipeline.input_columns(features, name_features)) | {ID_COLUMN}
+    chunks = iter_chunks(src, columns, chunksize=chunksize)
+    return write_chunks(
+        predict_chunks(chunks, model, encoder, features, vocabularies, name_features, geo_index,
+                       top_k, min_confidence),
+        dst,
+    )
+
+
+def prediction_model(entry, exact=False):
+    """The entry's compact forest when it has one, unless the full forest is asked for."""
+    compacted = entry.get("compact")
+    return entry["model"] if exact or compacted is None else compacted
+
+
+def load_entry(store_dir, key=None):
+    store = ModelStore(store_dir)
+    key = key or store.latest()
+    entry = store.get(key) if key else None
+    if entry is None:
+        what = f"model {key}" if key else "trained model"
+        raise LookupError(f"no {what} in {store_dir}; run the app once first")
+    return entry
+
+
+# ---------------------------------
+# CLI
+# ---------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict cuisines for a CSV/Parquet file of restaurants.")
+    parser.add_argument("input", help="CSV or Parquet file with the Dataset.csv columns")
+    parser.add_argument("output", help="CSV or Parquet file to write predictions to")
+    parser.add_argument("--store", default=os.environ.get("CUISINE_MODEL_STORE", ".model_store"))
+    parser.add_argument("--key", help="model store key (default: most recently used model)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--exact", action="store_true",
+                        help="predict with the full forest instead of its compact copy")
+    parser.add_argument("--top-k", type=int, default=0,
+                        help="also write the k likeliest cuisines and their probabilities")
+    parser.add_argument("--min-confidence", type=float,
+                        help="leave rows whose best probability is below this without a prediction")
+    args = parser.parse_args(argv)
+
+    try:
+        entry = load_entry(args.store, args.key)
+    except LookupError as exc:
+        parser.exit(1, f"error: {exc}\n")
+
+    features = entry.get("features") or pipeline.POSSIBLE_FEATURES
+    rows = predict_file(
+        args.input, args.output, prediction_model(entry, args.exact), entry["encoder"], features,
+        chunksize=args.chunksize, vocabularies=entry.get("vocabularies"),
+        name_features=entry.get("name_features", False), geo_index=entry.get("geo_index"),
+        top_k=args.top_k, min_confidence=args.min_confidence
+    )
+    print(f"Wrote {rows:,} predictions to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
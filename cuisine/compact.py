@@ -0,0 +1,139 @@
+"""Prediction-only, array-backed form of a fitted RandomForestClassifier.
+
+A fully grown forest over thousands of cuisine combinations stores a dense
+class-probability row per node, almost all zeros. CompactForest keeps the
+split arrays of every tree concatenated and, per leaf, only its top-k classes
+with probabilities quantized to uint8, so the model is a few flat arrays that
+pickle small, memory-map well and are traversed for all trees at once.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from sklearn.tree._tree import TREE_LEAF
+
+DEFAULT_TOP_K = 4
+SCORE_SCALE = 255
+# Dense per-chunk score buffer is rows x classes; keep it around 8M cells.
+CHUNK_CELLS = 8_000_000
+
+
+@dataclass
+class CompactForest:
+    classes_: np.ndarray
+    n_features_in_: int
+    roots: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    feature: np.ndarray
+    threshold: np.ndarray
+    missing_left: np.ndarray
+    leaf_labels: np.ndarray
+    leaf_scores: np.ndarray
+    max_depth: int
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        arrays = (self.classes_, self.roots, self.left, self.right, self.feature,
+                  self.threshold, self.missing_left, self.leaf_labels, self.leaf_scores)
+        return sum(array.nbytes for array in arrays)
+
+    def apply(self, X):
+        """(rows x trees) index of the leaf each row lands in, per tree."""
+        # Trees split float32 inputs against float64 thresholds, as sklearn does.
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        # Leaves point at themselves, so a fixed number of steps is enough.
+        for _ in range(self.max_depth):
+            values = X[rows, self.feature[node]]
+            # NaN (e.g. an unseen city) follows the side sklearn sends missing values to.
+            go_left = (values <= self.threshold[node]) | (np.isnan(values) & self.missing_left[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def iter_scores(self, X):
+        """(start, summed quantized leaf scores) per chunk of rows of X."""
+        n_classes = len(self.classes_)
+        chunk = max(1, CHUNK_CELLS // n_classes)
+        k = self.leaf_labels.shape[1]
+        for start in range(0, len(X), chunk):
+            leaves = self.apply(X[start:start + chunk])
+            n = len(leaves)
+            rows = np.repeat(np.arange(n), leaves.shape[1] * k)
+            cells = rows * n_classes + self.leaf_labels[leaves].ravel()
+            scores = np.bincount(
+                cells, weights=self.leaf_scores[leaves].ravel(), minlength=n * n_classes
+            )
+            yield start, scores.reshape(n, n_classes)
+
+    def predict_proba(self, X):
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float32)
+        norm = SCORE_SCALE * self.n_estimators
+        for start, scores in self.iter_scores(X):
+            proba[start:start + len(scores)] = scores / norm
+        return proba
+
+    def predict(self, X):
+        best = np.empty(len(X), dtype=np.intp)
+        for start, scores in self.iter_scores(X):
+            best[start:start + len(scores)] = scores.argmax(axis=1)
+        return self.classes_[best]
+
+
+def compact_forest(model, top_k=DEFAULT_TOP_K):
+    """CompactForest for a fitted single-output RandomForestClassifier."""
+    if model.n_outputs_ != 1:
+        raise ValueError("only single-output forests can be compacted")
+
+    n_classes = len(model.classes_)
+    top_k = min(top_k, n_classes)
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    sizes = np.array([tree.node_count for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    n_nodes = int(sizes.sum())
+    index_dtype = np.int32 if n_nodes < 2**31 else np.int64
+
+    left = np.empty(n_nodes, dtype=index_dtype)
+    right = np.empty(n_nodes, dtype=index_dtype)
+    feature = np.empty(n_nodes, dtype=np.min_scalar_type(max(model.n_features_in_ - 1, 0)))
+    threshold = np.empty(n_nodes, dtype=np.float64)
+    missing_left = np.zeros(n_nodes, dtype=bool)
+    leaf_labels = np.zeros((n_nodes, top_k), dtype=np.min_scalar_type(n_classes - 1))
+    leaf_scores = np.zeros((n_nodes, top_k), dtype=np.uint8)
+
+    for tree, offset in zip(trees, offsets):
+        nodes = np.arange(offset, offset + tree.node_count)
+        is_leaf = tree.children_left == TREE_LEAF
+        left[nodes] = np.where(is_leaf, nodes, tree.children_left + offset)
+        right[nodes] = np.where(is_leaf, nodes, tree.children_right + offset)
+        feature[nodes] = np.where(is_leaf, 0, tree.feature)
+        threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+        missing_left[nodes] = np.asarray(tree.missing_go_to_left, dtype=bool) & ~is_leaf
+
+        leaves = np.flatnonzero(is_leaf)
+        value = tree.value[leaves, 0, :]
+        value = value / value.sum(axis=1, keepdims=True)
+        top = np.argpartition(-value, top_k - 1, axis=1)[:, :top_k]
+        leaf_labels[leaves + offset] = top
+        leaf_scores[leaves + offset] = np.rint(
+            np.take_along_axis(value, top, axis=1) * SCORE_SCALE
+        )
+
+    return CompactForest(
+        classes_=np.asarray(model.classes_),
+        n_features_in_=model.n_features_in_,
+        roots=offsets.astype(index_dtype),
+        left=left,
+        right=right,
+        feature=feature,
+        threshold=threshold,
+        missing_left=missing_left,
+        leaf_labels=leaf_labels,
+        leaf_scores=leaf_scores,
+        max_depth=max(tree.max_depth for tree in trees),
+    )
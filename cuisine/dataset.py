@@ -0,0 +1,191 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:
+    pa = feather = None
+
+from cuisine import features as derived
+from cuisine.files import atomic_write
+from cuisine.pipeline import POSSIBLE_FEATURES, TARGET_COLUMN
+from cuisine.geo import COORDINATES
+from cuisine.text import NAME_COLUMN
+
+# ---------------------------------
+# Columns and compact dtypes
+# ---------------------------------
+DEFAULT_CHUNKSIZE = 500_000
+
+# Everything the app shows or models; free-text columns such as Address,
+# Locality and Locality Verbose are never read.
+DEFAULT_COLUMNS = list(dict.fromkeys([
+    "Restaurant ID",
+    NAME_COLUMN,
+    "Country Code",
+    "City",
+    *COORDINATES,
+    "Currency",
+    TARGET_COLUMN,
+    *derived.input_columns(POSSIBLE_FEATURES),
+    "Aggregate rating",
+    "Rating text",
+]))
+
+# Nullable integers: regional exports have blank cells, which encode to NaN.
+DTYPES = {
+    "Restaurant ID": "Int32",
+    # Chains repeat their name, so a category stores each name once.
+    NAME_COLUMN: "category",
+    "Country Code": "Int16",
+    "City": "category",
+    "Currency": "category",
+    "Cuisines": "category",
+    "Average Cost for two": "Int32",
+    "Has Table booking": "category",
+    "Has Online delivery": "category",
+    "Is delivering now": "category",
+    "Switch to order menu": "category",
+    "Price range": "Int8",
+    "Aggregate rating": "float32",
+    "Rating color": "category",
+    "Rating text": "category",
+    "Votes": "Int32",
+    "Longitude": "float64",
+    "Latitude": "float64",
+}
+
+
+# ---------------------------------
+# Loading
+# ---------------------------------
+def read_options(columns):
+    wanted = set(columns)
+    return {
+        "usecols": lambda col: col in wanted,
+        "dtype": {col: dtype for col, dtype in DTYPES.items() if col in wanted},
+    }
+
+
+def iter_dataset(path, columns=DEFAULT_COLUMNS, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream the dataset as compact DataFrames of at most chunksize rows."""
+    yield from pd.read_csv(path, chunksize=chunksize, **read_options(columns))
+
+
+def concat_chunks(chunks):
+    """Concatenate chunks, merging per-chunk categories instead of falling back to object."""
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    data = {}
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            data[col] = union_categoricals([chunk[col] for chunk in chunks], sort_categories=True)
+        else:
+            data[col] = pd.concat([chunk[col] for chunk in chunks], ignore_index=True)
+    return pd.DataFrame(data)
+
+
+def load_dataset(path, columns=DEFAULT_COLUMNS, chunksize=None):
+    """Read only the given columns with compact dtypes, optionally chunk by chunk.
+
+    Reading in chunks bounds the parser's working memory to one chunk; the
+    compact result is assembled at the end.
+    """
+    if chunksize is None:
+        return pd.read_csv(path, **read_options(columns))
+    return concat_chunks(iter_dataset(path, columns, chunksize))
+
+
+# ---------------------------------
+# Columnar cache
+# ---------------------------------
+def cache_path(path, columns):
+    """Feather file next to the source, one per column selection and conversion table."""
+    key = ",".join([*columns, derived.RATES_VERSION])
+    digest = hashlib.blake2b(key.encode(), digest_size=4).hexdigest()
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, f".{name}.{digest}.feather")
+
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_metadata(path):
+    stat = os.stat(path)
+    return {"source_size": str(stat.st_size), "source_mtime_ns": str(stat.st_mtime_ns)}
+
+
+def read_cache(path, columns):
+    """Memory-mapped cached frame, or None when the cache is missing or stale."""
+    feather_path = cache_path(path, columns)
+    try:
+        table = feather.read_table(feather_path, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    cached = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+    current = source_metadata(path)
+    fresh = cached.get("source_size") == current["source_size"] and (
+        cached.get("source_mtime_ns") == current["source_mtime_ns"]
+        # Touched after caching, but already found unchanged (see below).
+        or int(current["source_mtime_ns"]) <= os.stat(feather_path).st_mtime_ns
+    )
+    if not fresh:
+        # A touched but unchanged file (checkout, copy) still matches on content.
+        if cached.get("source_hash") != file_hash(path):
+            return None
+        # Make the cache newer than the source, so later starts skip the hash.
+        try:
+            os.utime(feather_path)
+        except OSError:
+            pass
+    # Numeric columns without nulls are handed to pandas without a copy.
+    return table.to_pandas(split_blocks=True)
+
+
+def write_cache(path, columns, df):
+    feather_path = cache_path(path, columns)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({
+        key.encode(): value.encode()
+        for key, value in {**source_metadata(path), "source_hash": file_hash(path)}.items()
+    })
+    table = table.replace_schema_metadata(metadata)
+
+    atomic_write(
+        # Uncompressed so later loads can memory-map it.
+        feather_path, lambda tmp_path: feather.write_feather(table, tmp_path, compression="uncompressed")
+    )
+
+
+def load_cached(path, columns=DEFAULT_COLUMNS, chunksize=None):
+    """load_dataset through a Feather cache that is rebuilt whenever the CSV changes.
+
+    Derived feature columns are computed once and cached alongside the raw ones.
+    """
+    if feather is None:
+        return derived.add_derived(load_dataset(path, columns, chunksize))
+
+    df = read_cache(path, columns)
+    if df is not None:
+        return df
+
+    df = derived.add_derived(load_dataset(path, columns, chunksize))
+    try:
+        write_cache(path, columns, df)
+    except OSError:
+        # Read-only data directory: keep serving from the CSV.
+        pass
+    return df
@@ -0,0 +1,197 @@
+import math
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from scipy import sparse
+from sklearn.metrics import (
+    accuracy_score,
+    multilabel_confusion_matrix,
+    precision_recall_fscore_support,
+)
+
+from cuisine import multilabel, text
+from cuisine.batch import DEFAULT_CHUNKSIZE
+from cuisine.pipeline import RANDOM_STATE
+
+# Permutation importance scores at most this many test rows, this many times per feature.
+IMPORTANCE_ROWS = 5000
+IMPORTANCE_REPEATS = 5
+
+
+# ---------------------------------
+# Evaluation artifacts
+# ---------------------------------
+@dataclass
+class Evaluation:
+    y_pred: np.ndarray
+    accuracy: float
+    report_table: pd.DataFrame
+    confusion: pd.DataFrame
+
+    @property
+    def summary(self):
+        return summary_table(self.report_table, self.accuracy)
+
+
+def per_class_table(y_true, y_pred, labels, names):
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_true, y_pred, labels=labels, zero_division=0
+    )
+    return pd.DataFrame({
+        "Cuisine": names,
+        "Precision": precision,
+        "Recall": recall,
+        "F1": f1,
+        "Support": support,
+    })
+
+
+def summary_table(report_table, accuracy):
+    """Accuracy and macro/support-weighted averages of the per-class table."""
+    metrics = report_table[["Precision", "Recall", "F1"]]
+    support = report_table["Support"].to_numpy()
+    weighted = metrics.mul(support, axis=0).sum() / max(support.sum(), 1)
+    return pd.DataFrame({
+        "Average": ["Macro", "Weighted"],
+        "Precision": [metrics["Precision"].mean(), weighted["Precision"]],
+        "Recall": [metrics["Recall"].mean(), weighted["Recall"]],
+        "F1": [metrics["F1"].mean(), weighted["F1"]],
+        "Support": [support.sum()] * 2,
+    })
+
+
+def page_count(n_rows, page_size):
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def class_page(report_table, sort_by, page_size, page=0, ascending=False):
+    """One page of the per-class table sorted by sort_by, so only page_size rows are rendered."""
+    start = min(page, page_count(len(report_table), page_size) - 1) * page_size
+    ordered = report_table.sort_values(sort_by, ascending=ascending, kind="stable", ignore_index=True)
+    return ordered.iloc[start:start + page_size]
+
+
+def confusion_pairs(y_true, y_pred, classes):
+    """Sparse confusion data: one row per (true, predicted) pair that occurs."""
+    counts = (
+        pd.DataFrame({"true": y_true, "pred": y_pred})
+        .value_counts()
+        .rename("Count")
+        .reset_index()
+    )
+    return pd.DataFrame({
+        "True": classes[counts["true"].to_numpy()],
+        "Predicted": classes[counts["pred"].to_numpy()],
+        "Count": counts["Count"].to_numpy(),
+    })
+
+
+def tag_confusion(y_true, y_pred, classes):
+    matrices = multilabel_confusion_matrix(y_true, y_pred)
+    return pd.DataFrame({
+        "Cuisine": classes,
+        "TN": matrices[:, 0, 0],
+        "FP": matrices[:, 0, 1],
+        "FN": matrices[:, 1, 0],
+        "TP": matrices[:, 1, 1],
+    })
+
+
+def test_predictions(model, data, chunksize=DEFAULT_CHUNKSIZE):
+    """model's predictions on the held-out split: class codes, or a tag indicator matrix.
+
+    Rows are predicted chunksize at a time, so only one chunk's rows x classes
+    probabilities is ever in memory, however large the test set.
+    """
+    parts = []
+    for start in range(0, len(data.test_idx), chunksize):
+        X = data.X[data.test_idx[start:start + chunksize]]
+        if data.multilabel:
+            # The tags every prediction surface reports (cuisine.batch.prediction_columns).
+            parts.append(multilabel.predicted_mask(multilabel.tag_scores(model, X)).astype(np.uint8))
+        else:
+            parts.append(model.predict(X))
+    return np.concatenate(parts)
+
+
+def evaluate(model, data):
+    """Score model on the held-out split once; everything tab 3 needs comes from here."""
+    classes = np.asarray(data.encoder.classes_)
+    y_pred = test_predictions(model, data)
+
+    if data.multilabel:
+        y_true = data.y_test.toarray()
+        labels = np.arange(len(classes))
+        confusion = tag_confusion(y_true, y_pred, classes)
+    else:
+        y_true = data.y_test
+        labels = np.union1d(y_true, y_pred)
+        confusion = confusion_pairs(y_true, y_pred, classes)
+
+    return Evaluation(
+        y_pred=y_pred,
+        accuracy=accuracy_score(y_true, y_pred),
+        report_table=per_class_table(y_true, y_pred, labels, classes[labels]),
+        confusion=confusion,
+    )
+
+
+# ---------------------------------
+# Permutation importance
+# ---------------------------------
+def column_groups(data):
+    """Columns of data.X shuffled together, by the input they come from.
+
+    Hashed name and feature tokens cannot be traced back to single columns,
+    so a sparse name-feature matrix has one group per block.
+    """
+    if not data.name_features:
+        return {col: slice(j, j + 1) for j, col in enumerate(data.features)}
+    return {
+        text.NAME_COLUMN: slice(0, text.NAME_BUCKETS),
+        "Other features": slice(text.NAME_BUCKETS, data.X.shape[1]),
+    }
+
+
+def permute_columns(X, columns, order):
+    """X with the rows of the columns slice reordered."""
+    if sparse.issparse(X):
+        return sparse.hstack(
+            [X[:, :columns.start], X[order][:, columns], X[:, columns.stop:]], format="csr"
+        )
+    permuted = X.copy()
+    permuted[:, columns] = X[order, columns]
+    return permuted
+
+
+def permutation_importance(model, data, n_repeats=IMPORTANCE_REPEATS, max_rows=IMPORTANCE_ROWS,
+                           random_state=RANDOM_STATE):
+    """Mean drop in test accuracy when each input is shuffled, sorted most important first.
+
+    Works for any model with predict, unlike impurity importances, and scores
+    at most max_rows test rows so its cost does not grow with the dataset.
+    """
+    rng = np.random.default_rng(random_state)
+    rows = data.test_idx
+    if len(rows) > max_rows:
+        rows = np.sort(rng.choice(rows, max_rows, replace=False))
+    X = data.X[rows]
+    y = data.y[rows]
+    y = y.toarray() if sparse.issparse(y) else y
+
+    baseline = accuracy_score(y, model.predict(X))
+    groups = column_groups(data)
+    drops = np.empty((len(groups), n_repeats))
+    for i, columns in enumerate(groups.values()):
+        for r in range(n_repeats):
+            permuted = permute_columns(X, columns, rng.permutation(len(rows)))
+            drops[i, r] = baseline - accuracy_score(y, model.predict(permuted))
+
+    return pd.DataFrame({
+        "Feature": list(groups),
+        "Importance": drops.mean(axis=1),
+        "Std": drops.std(axis=1),
+    }).sort_values("Importance", ascending=False, ignore_index=True)
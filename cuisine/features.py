@@ -0,0 +1,112 @@
+"""Derived and categorical model features.
+
+"Average Cost for two" is in each country's own currency, so the same number
+means very different prices in India and the US. COST_USD converts it with a
+fixed local table. Country Code and City enter the model as compact integer
+category codes; the vocabulary is fitted on the whole loaded dataset (it
+carries no target information) and saved with the model so new rows are
+encoded the same way.
+"""
+import numpy as np
+import pandas as pd
+
+COST_COLUMN = "Average Cost for two"
+COUNTRY_COLUMN = "Country Code"
+CITY_COLUMN = "City"
+COST_USD = "Cost for two (USD)"
+
+# US dollars per unit of local currency, keyed by Country Code: the Currency
+# column is ambiguous ("Dollar($)" is used for four countries, and the
+# Philippines' pesos are labelled Botswana Pula). Approximate 2018 averages,
+# the period Dataset.csv was collected in.
+USD_PER_UNIT = {
+    1: 0.0146,       # India, INR
+    14: 0.748,       # Australia, AUD
+    30: 0.274,       # Brazil, BRL
+    37: 0.772,       # Canada, CAD
+    94: 0.0000703,   # Indonesia, IDR
+    148: 0.692,      # New Zealand, NZD
+    162: 0.0190,     # Philippines, PHP
+    166: 0.2747,     # Qatar, QAR
+    184: 0.741,      # Singapore, SGD
+    189: 0.0755,     # South Africa, ZAR
+    191: 0.00617,    # Sri Lanka, LKR
+    208: 0.209,      # Turkey, TRY
+    214: 0.2723,     # UAE, AED
+    215: 1.335,      # United Kingdom, GBP
+    216: 1.0,        # United States, USD
+}
+# Bump when the table changes so cached derived columns are rebuilt.
+RATES_VERSION = "2018-avg"
+
+DERIVED_SOURCES = {COST_USD: [COST_COLUMN, COUNTRY_COLUMN]}
+CATEGORICAL_FEATURES = [COUNTRY_COLUMN, CITY_COLUMN]
+
+
+# ---------------------------------
+# Derived columns
+# ---------------------------------
+def cost_usd(df):
+    """Cost for two in US dollars; NaN for countries missing from the table."""
+    countries = df[COUNTRY_COLUMN].to_numpy(dtype=np.int64, na_value=-1)
+    codes = np.array(sorted(USD_PER_UNIT))
+    rates = np.array([USD_PER_UNIT[code] for code in codes], dtype=np.float64)
+    pos = np.minimum(np.searchsorted(codes, countries), len(codes) - 1)
+    rate = np.where(codes[pos] == countries, rates[pos], np.nan)
+    cost = df[COST_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+    return (cost * rate).astype(np.float32)
+
+
+DERIVE = {COST_USD: cost_usd}
+
+
+def is_available(col, columns):
+    """col can be read from, or derived from, a frame with these columns."""
+    return col in columns or all(src in columns for src in DERIVED_SOURCES.get(col, [None]))
+
+
+def derived_columns(columns):
+    return [col for col in DERIVED_SOURCES if is_available(col, columns) and col not in columns]
+
+
+def add_derived(df):
+    """df plus every derived column its columns allow."""
+    derived = derived_columns(df.columns)
+    if not derived:
+        return df
+    return df.assign(**{col: DERIVE[col](df) for col in derived})
+
+
+def column_values(df, col):
+    """A feature column from df, derived on the fly when it is not stored."""
+    if col in df.columns:
+        return df[col]
+    return pd.Series(DERIVE[col](df), index=df.index, name=col)
+
+
+def input_columns(features):
+    """Raw columns a frame needs so every feature can be encoded."""
+    columns = []
+    for col in features:
+        for src in DERIVED_SOURCES.get(col, [col]):
+            if src not in columns:
+                columns.append(src)
+    return columns
+
+
+# ---------------------------------
+# Categorical codes
+# ---------------------------------
+def fit_vocabularies(df, features):
+    """Sorted categories of each categorical feature, as seen in df."""
+    return {
+        col: np.sort(np.asarray(df[col].dropna().unique()))
+        for col in features
+        if col in CATEGORICAL_FEATURES
+    }
+
+
+def category_codes(values, categories):
+    """Integer code of each value in categories; NaN for unseen or missing values."""
+    codes = pd.Categorical(values, categories=categories).codes
+    return np.where(codes < 0, np.nan, codes)
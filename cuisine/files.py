@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+
+def atomic_write(path, write):
+    """Replace path with what write(tmp_path) writes, so readers never see a partial file.
+
+    The temporary file sits in path's folder, so the final rename stays on one
+    filesystem; it is removed if write fails.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def atomic_write_text(path, text):
+    atomic_write(path, lambda tmp_path: write_text(tmp_path, text))
+
+
+def write_text(path, text):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(text)
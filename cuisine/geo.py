@@ -0,0 +1,128 @@
+"""Neighbourhood cuisine features from restaurant coordinates.
+
+A restaurant's neighbours say something about it: a street full of Chinese
+places, a food court of fast food. GeoIndex keeps a KD-tree over the
+training restaurants' coordinates together with their cuisine tags; each
+restaurant gets the share of each common tag among its k nearest neighbours
+and the distance to the k-th one, a measure of how dense the area is.
+
+Points are placed on a sphere as 3D vectors in kilometres, so neighbours
+are found with a plain Euclidean KD-tree and distances are straight-line
+(chord) ones, which for nearby points are the great-circle distance.
+Training rows leave themselves out of their own neighbourhood.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from scipy.spatial import cKDTree
+
+LATITUDE_COLUMN = "Latitude"
+LONGITUDE_COLUMN = "Longitude"
+COORDINATES = [LONGITUDE_COLUMN, LATITUDE_COLUMN]
+EARTH_RADIUS_KM = 6371.0
+
+PREFIX = "Nearby "
+DISTANCE_FEATURE = "Nearby distance (km)"
+DEFAULT_NEIGHBORS = 10
+DEFAULT_TAGS = 12
+# Rows queried at once; bounds the (rows x k x tags) gather.
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def is_available(columns):
+    return all(col in columns for col in COORDINATES)
+
+
+def is_nearby(col):
+    return col.startswith(PREFIX)
+
+
+def coordinates(df):
+    lat = df[LATITUDE_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+    lon = df[LONGITUDE_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+    # The dataset uses (0, 0) for restaurants without a location.
+    known = np.isfinite(lat) & np.isfinite(lon) & ((lat != 0) | (lon != 0))
+    return lat, lon, known
+
+
+def to_xyz(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return EARTH_RADIUS_KM * np.column_stack([
+        np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)
+    ])
+
+
+# ---------------------------------
+# Index
+# ---------------------------------
+@dataclass
+class GeoIndex:
+    tree: cKDTree
+    tags: np.ndarray
+    tag_flags: np.ndarray
+    k: int
+    center: tuple
+
+    @property
+    def columns(self):
+        return [f"{PREFIX}{tag}" for tag in self.tags] + [DISTANCE_FEATURE]
+
+
+def fit_index(df, rows, tag_matrix, tag_names, k=DEFAULT_NEIGHBORS, n_tags=DEFAULT_TAGS,
+              exclude_tags=()):
+    """GeoIndex over df's rows with a location, with the n_tags commonest tags among them.
+
+    tag_matrix is the sparse (rows of df x tags) cuisine indicator of cuisine.multilabel.
+    """
+    lat, lon, known = coordinates(df)
+    points = rows[known[rows]]
+    counts = np.asarray(tag_matrix[points].sum(axis=0)).ravel().astype(np.int64)
+    counts[np.isin(tag_names, list(exclude_tags))] = 0
+    top = np.argsort(-counts, kind="stable")[:n_tags]
+    top = top[counts[top] > 0]
+    return GeoIndex(
+        # Built once; queries are then O(log n) and release the GIL.
+        tree=cKDTree(to_xyz(lat[points], lon[points]), balanced_tree=False),
+        tags=np.asarray(tag_names)[top],
+        tag_flags=tag_matrix[points][:, top].toarray().astype(np.uint8),
+        k=min(k, max(len(points) - 1, 1)),
+        center=(float(np.median(lat[points])), float(np.median(lon[points]))),
+    )
+
+
+def nearby_features(index, df, own_points=None, chunksize=DEFAULT_CHUNKSIZE):
+    """(rows x len(index.columns)) neighbourhood shares and k-th distance, NaN without a location.
+
+    own_points[i] is the index point of row i (-1 for none); that point is
+    left out of row i's neighbours, so training rows do not see their own label.
+    """
+    lat, lon, known = coordinates(df)
+    k = index.k
+    out = np.full((len(df), len(index.tags) + 1), np.nan, dtype=np.float32)
+    rows = np.flatnonzero(known)
+    for start in range(0, len(rows), chunksize):
+        chunk = rows[start:start + chunksize]
+        distance, neighbors = index.tree.query(to_xyz(lat[chunk], lon[chunk]), k=k + 1, workers=-1)
+        neighbors = neighbors.reshape(len(chunk), k + 1)
+        distance = distance.reshape(len(chunk), k + 1)
+        # Drop the row's own point if it was found, else the farthest of the k + 1.
+        drop = np.full((len(chunk), k + 1), False)
+        if own_points is not None:
+            drop = neighbors == own_points[chunk][:, None]
+        drop[~drop.any(axis=1), k] = True
+        neighbors = neighbors[~drop].reshape(len(chunk), k)
+        distance = distance[~drop].reshape(len(chunk), k)
+
+        out[chunk, :-1] = index.tag_flags[neighbors].sum(axis=1, dtype=np.float32) / k
+        out[chunk, -1] = distance[:, -1]
+    return out
+
+
+def training_features(index, df, rows):
+    """nearby_features for every row of df, leaving rows (those index was fitted on) out of their own."""
+    _, _, known = coordinates(df)
+    points = rows[known[rows]]
+    own_points = np.full(len(df), -1)
+    own_points[points] = np.arange(len(points))
+    return nearby_features(index, df, own_points)
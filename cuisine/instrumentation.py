@@ -0,0 +1,186 @@
+"""Per-rerun stage timings, cache hit/miss flags and memory deltas.
+
+A Recorder is created at the top of each script run and `lap(name)` closes a
+stage: its wall time and RSS change are those since the previous lap. Cached
+functions call `cache_miss()` from their body, which only runs on a miss, so
+a lap declared `cached=True` reads "hit" unless the body ran.
+
+Finished runs are logged as one JSON line on the "cuisine.perf" logger and
+folded into a process-wide Prometheus registry, which can be written to a
+node-exporter textfile collector.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+from cuisine.files import atomic_write_text
+
+logger = logging.getLogger("cuisine.perf")
+
+# Histogram buckets in seconds, from cheap cache hits up to a full fit.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_local = threading.local()
+
+
+def current_rss():
+    """Resident set size in bytes, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------------------------
+# Per-run recording
+# ---------------------------------
+@dataclass
+class Stage:
+    stage: str
+    seconds: float
+    cache: str = None
+    rss_delta: int = None
+
+
+class Recorder:
+    def __init__(self):
+        self.stages = []
+        self.started = self.last = time.perf_counter()
+        self.last_rss = current_rss()
+        self.cache = None
+        # Cached functions run in the calling thread, so cache_miss finds us here.
+        _local.recorder = self
+
+    def miss(self):
+        self.cache = "miss"
+
+    def lap(self, name, cached=False):
+        now, rss = time.perf_counter(), current_rss()
+        self.stages.append(Stage(
+            stage=name,
+            seconds=now - self.last,
+            cache=self.cache or ("hit" if cached else None),
+            rss_delta=None if rss is None or self.last_rss is None else rss - self.last_rss,
+        ))
+        self.last, self.last_rss, self.cache = now, rss, None
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def frame(self):
+        return pd.DataFrame({
+            "Stage": [s.stage for s in self.stages],
+            "ms": [s.seconds * 1000 for s in self.stages],
+            "Cache": [s.cache or "" for s in self.stages],
+            "ΔMB": [None if s.rss_delta is None else s.rss_delta / 2**20 for s in self.stages],
+        })
+
+    def finish(self, registry=None, metrics_path=None):
+        """Log the run and add it to the metrics registry; returns the log record."""
+        record = {
+            "event": "rerun",
+            "ts": time.time(),
+            "total_seconds": self.total,
+            "stages": [asdict(stage) for stage in self.stages],
+        }
+        logger.info(json.dumps(record))
+        registry = registry or REGISTRY
+        registry.observe(self)
+        if metrics_path:
+            registry.write(metrics_path)
+        return record
+
+
+def cache_miss():
+    """Mark the stage in progress on this thread as a cache miss."""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is not None:
+        recorder.miss()
+
+
+def log_to_stderr():
+    """Send the per-run JSON lines to stderr (once per process)."""
+    if not any(getattr(h, "_cuisine_perf", False) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler._cuisine_perf = True
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+# ---------------------------------
+# Prometheus metrics
+# ---------------------------------
+def format_labels(labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}" if labels else ""
+
+
+class Metrics:
+    """Minimal Prometheus registry: stage histograms, cache counters and set values."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.cache_counts = {}
+        self.values = {}
+        self.reruns = 0
+
+    def observe(self, recorder):
+        with self.lock:
+            self.reruns += 1
+            for stage in [*recorder.stages, Stage("total", recorder.total)]:
+                counts, total, n = self.histograms.get(stage.stage, ([0] * len(self.buckets), 0.0, 0))
+                for i, bound in enumerate(self.buckets):
+                    if stage.seconds <= bound:
+                        counts[i] += 1
+                self.histograms[stage.stage] = (counts, total + stage.seconds, n + 1)
+                if stage.cache:
+                    key = (stage.stage, stage.cache)
+                    self.cache_counts[key] = self.cache_counts.get(key, 0) + 1
+
+    def set_value(self, name, value, help_text, kind="gauge"):
+        """Export a value owned elsewhere, such as model pool size or its counters."""
+        with self.lock:
+            self.values[name] = (kind, help_text, value)
+
+    def render(self):
+        with self.lock:
+            lines = [
+                "# HELP cuisine_reruns_total Completed script runs.",
+                "# TYPE cuisine_reruns_total counter",
+                f"cuisine_reruns_total {self.reruns}",
+                "# HELP cuisine_stage_seconds Wall time per pipeline stage of a script run.",
+                "# TYPE cuisine_stage_seconds histogram",
+            ]
+            for stage, (counts, total, n) in sorted(self.histograms.items()):
+                for bound, count in [*zip(self.buckets, counts), ("+Inf", n)]:
+                    labels = format_labels([("stage", stage), ("le", bound)])
+                    lines.append(f"cuisine_stage_seconds_bucket{labels} {count}")
+                labels = format_labels([("stage", stage)])
+                lines.append(f"cuisine_stage_seconds_sum{labels} {total}")
+                lines.append(f"cuisine_stage_seconds_count{labels} {n}")
+            lines += [
+                "# HELP cuisine_cache_requests_total Cached stage lookups by result.",
+                "# TYPE cuisine_cache_requests_total counter",
+            ]
+            for (stage, result), count in sorted(self.cache_counts.items()):
+                lines.append(f"cuisine_cache_requests_total{format_labels([('stage', stage), ('result', result)])} {count}")
+            for name, (kind, help_text, value) in sorted(self.values.items()):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically replace path with the current metrics (textfile collector format)."""
+        atomic_write_text(path, self.render())
+
+
+REGISTRY = Metrics()
@@ -0,0 +1,185 @@
+import multiprocessing
+import sys
+import threading
+import time
+import types
+
+from dataclasses import dataclass
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from cuisine import compact, evaluation, training
+
+
+# ---------------------------------
+# Worker
+# ---------------------------------
+@dataclass
+class ExtraTrees:
+    """Trees fitted to grow the forest stored under base_key."""
+    base_key: str
+    model: object
+    fit_seconds: float
+
+
+def run_training_job(key, store, data, n_estimators, params, start=0, base_key=None, progress=None):
+    """Fit, evaluate and save into store; runs in a worker process.
+
+    The model store is the hand-off: the app picks the result up from disk, so
+    the fitted forest is never pickled back through the pool. With start, only
+    trees start..n_estimators-1 of the forest are fitted and returned as
+    ExtraTrees for the app to merge onto the forest it already holds, so
+    growing a forest costs the new trees, not the whole forest.
+    """
+    def report(done, total):
+        if progress is not None:
+            progress[key] = (done, total)
+
+    fit_start = time.perf_counter()
+    if start:
+        extra = training.fit_extra_trees(
+            data.X_train, data.y_train, start, n_estimators, progress=report, **params
+        )
+        return ExtraTrees(base_key, extra, time.perf_counter() - fit_start)
+
+    if data.name_features:
+        model = training.fit_linear(data.X_train, data.y_train, n_jobs=params.get("n_jobs"))
+        report(1, 1)
+    else:
+        model = training.fit_forest(data.X_train, data.y_train, n_estimators, progress=report, **params)
+    fit_seconds = time.perf_counter() - fit_start
+
+    save_model(key, store, data, model, evaluation.evaluate(model, data), fit_seconds)
+    return key
+
+
+def save_model(key, store, data, model, scores, fit_seconds):
+    """Put model, its evaluation and a compact copy into store; also used for grown and trimmed forests."""
+    # Prediction-only copy of forests for the batch and serving tools.
+    compacted = None if data.multilabel or data.name_features else compact.compact_forest(model)
+    store.put(key, model, data.encoder, features=data.features, vocabularies=data.vocabularies,
+              name_features=data.name_features, geo_index=data.geo_index,
+              evaluation=scores, compact=compacted, metrics={
+        "fit_seconds": fit_seconds,
+        "train_samples": len(data.train_idx),
+        "n_classes": len(model.classes_),
+        "accuracy": scores.accuracy,
+    })
+
+
+# ---------------------------------
+# Job manager
+# ---------------------------------
+@contextmanager
+def detached_main():
+    """Hide __main__ from processes spawned inside the block.
+
+    Spawned children re-run the parent's __main__ file, and `streamlit run`
+    installs app.py as __main__; a worker must not execute the whole app.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+class TrainingJobs:
+    """Process-pool training shared by every session of the app.
+
+    Jobs are keyed on the model key: submitting a key that is already queued
+    or running returns the existing future instead of starting a second fit.
+    """
+
+    def __init__(self, max_workers=1):
+        # Streamlit serves sessions from threads; forking a threaded process
+        # is unsafe, so workers are spawned fresh.
+        self.context = multiprocessing.get_context("spawn")
+        self.max_workers = max_workers
+        self.executor = self.new_executor()
+        with detached_main():
+            self.manager = self.context.Manager()
+        self.progress = self.manager.dict()
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def submit(self, key, store, data, n_estimators, params, start=0, base_key=None):
+        with self.lock:
+            future = self.futures.get(key)
+            if future is not None and not (future.done() and future.exception()):
+                return future
+            self.progress[key] = (0, n_estimators - start)
+            # Workers are started lazily by submit.
+            with detached_main():
+                try:
+                    future = self.executor.submit(
+                        run_training_job, key, store, data, n_estimators, params,
+                        start=start, base_key=base_key, progress=self.progress
+                    )
+                except BrokenProcessPool as exc:
+                    # A worker died (usually killed for running out of memory) and
+                    # took the pool with it: start a fresh one and fail this job, so
+                    # the next submit runs on the new pool.
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = self.new_executor()
+                    future = Future()
+                    future.set_exception(BrokenProcessPool(
+                        f"a training worker died, possibly out of memory ({exc}); "
+                        "the worker pool was restarted"
+                    ))
+            self.futures[key] = future
+            return future
+
+    def new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.context)
+
+    def get(self, key):
+        return self.futures.get(key)
+
+    def status(self, key):
+        future = self.futures.get(key)
+        if future is None:
+            return None
+        if not future.done():
+            return "running" if future.running() else "queued"
+        return "failed" if future.exception() else "done"
+
+    def progress_of(self, key):
+        return self.progress.get(key, (0, 0))
+
+    def forget(self, key):
+        """Drop a finished job once its model has been picked up from the store."""
+        with self.lock:
+            future = self.futures.get(key)
+            if future is not None and future.done():
+                del self.futures[key]
+                self.progress.pop(key, None)
+
+    def running(self):
+        return {key: self.status(key) for key in list(self.futures) if not self.futures[key].done()}
+
+
+class BackgroundTasks:
+    """Keyed follow-up work on models already in memory, such as permutation importance.
+
+    Runs on threads, so the fitted model is shared rather than pickled to a
+    worker. Like TrainingJobs, submitting a key that is pending or done
+    returns the existing future; failed tasks are retried.
+    """
+
+    def __init__(self, max_workers=1):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cuisine-task")
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        with self.lock:
+            future = self.futures.get(key)
+            if future is None or (future.done() and future.exception()):
+                future = self.futures[key] = self.executor.submit(fn, *args, **kwargs)
+            return future
+
+    def get(self, key):
+        return self.futures.get(key)
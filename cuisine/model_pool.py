@@ -0,0 +1,120 @@
+import sys
+import threading
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from scipy import sparse
+from sklearn.tree._tree import Tree
+
+
+# ---------------------------------
+# Footprint
+# ---------------------------------
+def footprint(obj, seen=None):
+    """Approximate bytes held by obj: array buffers plus Python object overhead.
+
+    Fitted forests are dominated by their trees' node and value arrays, which
+    sys.getsizeof does not see; those are summed explicitly. Objects shared
+    between several references are counted once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, Tree):
+        state = obj.__getstate__()
+        return state["nodes"].nbytes + state["values"].nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(obj, pd.DataFrame) else int(usage)
+    if sparse.issparse(obj):
+        return sum(footprint(part, seen) for part in vars(obj).values())
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            footprint(key, seen) + footprint(value, seen) for key, value in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(footprint(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + footprint(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+# ---------------------------------
+# Pool
+# ---------------------------------
+class ModelPool:
+    """Process-wide LRU of fitted models bounded by a memory budget.
+
+    Every session of the app shares one pool. Adding an entry evicts the least
+    recently used ones until the total footprint fits in max_bytes again; an
+    entry larger than the whole budget is kept on its own rather than refused,
+    since the session that asked for it is about to use it.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = footprint(value)
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self.sizes[key] = nbytes
+            self.evict(keep=key)
+        return value
+
+    def evict(self, keep=None):
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            if key == keep:
+                break
+            del self.entries[key]
+            del self.sizes[key]
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def nbytes(self):
+        return sum(self.sizes.values())
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+
+import joblib
+
+from cuisine.files import atomic_write
+
+
+# ---------------------------------
+# On-disk model registry
+# ---------------------------------
+class ModelStore:
+    """Fitted models, encoders and metrics persisted with joblib, evicted LRU by access time."""
+
+    suffix = ".joblib"
+
+    def __init__(self, root, max_entries=8):
+        self.root = root
+        self.max_entries = max_entries
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def make_key(data_hash, features, n_estimators, test_size, random_state, **params):
+        """Hex key for one fitted model; n_estimators=None keys the whole forest family."""
+        fields = {
+            "data_hash": data_hash,
+            "features": list(features),
+            "n_estimators": None if n_estimators is None else int(n_estimators),
+            "test_size": round(float(test_size), 6),
+            "random_state": random_state,
+            **params,
+        }
+        payload = json.dumps(fields, sort_keys=True).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key + self.suffix)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            entry = joblib.load(path, mmap_mode="r")
+        except (FileNotFoundError, EOFError):
+            return None
+        # Loading counts as a use for LRU purposes.
+        os.utime(path)
+        return entry
+
+    def put(self, key, model, encoder, metrics=None, features=None, evaluation=None, compact=None,
+            vocabularies=None, name_features=False, geo_index=None):
+        entry = {
+            "model": model,
+            "compact": compact,
+            "encoder": encoder,
+            "features": list(features) if features is not None else None,
+            "vocabularies": vocabularies or {},
+            "name_features": name_features,
+            "geo_index": geo_index,
+            "metrics": metrics or {},
+            "evaluation": evaluation,
+        }
+        atomic_write(self.path(key), lambda tmp_path: joblib.dump(entry, tmp_path))
+        self.evict()
+        return entry
+
+    def keys(self):
+        return [
+            name[:-len(self.suffix)]
+            for name in os.listdir(self.root)
+            if name.endswith(self.suffix)
+        ]
+
+    def latest(self):
+        """Key of the most recently used entry, or None for an empty store."""
+        newest = None
+        for key in self.keys():
+            try:
+                mtime = os.path.getmtime(self.path(key))
+            except FileNotFoundError:
+                continue
+            if newest is None or mtime > newest[0]:
+                newest = (mtime, key)
+        return newest[1] if newest else None
+
+    def evict(self):
+        entries = []
+        for key in self.keys():
+            path = self.path(key)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,88 @@
+import numpy as np
+
+from scipy import sparse
+from sklearn.preprocessing import MultiLabelBinarizer
+
+TAG_SEPARATOR = ","
+DEFAULT_TOP_K = 3
+# A tag is predicted when its probability is above this.
+TAG_THRESHOLD = 0.5
+
+
+# ---------------------------------
+# Target encoding
+# ---------------------------------
+def split_tags(value):
+    return [tag.strip() for tag in value.split(TAG_SEPARATOR) if tag.strip()]
+
+
+def encode_tags(values, missing_label):
+    """Binarize a Cuisines column into a sparse (rows x tags) indicator matrix.
+
+    Each distinct Cuisines string is split once; rows then just pick the row
+    of their string, so the cost is per distinct combination, not per row.
+    """
+    values = values.astype("category")
+    combos = values.cat.categories.to_numpy(dtype=object)
+    codes = values.cat.codes.to_numpy()
+
+    mlb = MultiLabelBinarizer(sparse_output=True)
+    combo_tags = mlb.fit_transform([split_tags(combo) for combo in combos] + [[missing_label]]).tocsr()
+    # Missing values (code -1) map to the extra missing-label row appended last.
+    codes = np.where(codes < 0, len(combos), codes)
+
+    used = np.flatnonzero(combo_tags[np.unique(codes)].getnnz(axis=0))
+    if len(used) < len(mlb.classes_):
+        mlb = MultiLabelBinarizer(classes=mlb.classes_[used], sparse_output=True).fit([[]])
+        combo_tags = combo_tags[:, used]
+    return mlb, sparse.csr_matrix(combo_tags[codes], dtype=np.uint8)
+
+
+# ---------------------------------
+# Prediction
+# ---------------------------------
+def tag_scores(model, X):
+    """(rows x tags) probability that each tag applies, from a multi-output forest or one-vs-rest model."""
+    per_tag = model.predict_proba(X)
+    if not isinstance(per_tag, list):
+        return per_tag
+    scores = np.zeros((X.shape[0], len(per_tag)))
+    for j, (proba, classes) in enumerate(zip(per_tag, model.classes_)):
+        positive = np.flatnonzero(classes == 1)
+        if positive.size:
+            scores[:, j] = proba[:, positive[0]]
+    return scores
+
+
+def top_k(scores, k=DEFAULT_TOP_K):
+    """Indices and values of the k highest scores per row, best first, without a full sort."""
+    k = min(k, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part = np.take_along_axis(scores, idx, axis=1)
+    # Ties go to the lower index, as argmax (and so predict) does.
+    order = np.lexsort((idx, -part), axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def predict_tags(model, encoder, X, k=DEFAULT_TOP_K):
+    """Top-k cuisine tags and their probabilities for every row of X."""
+    idx, scores = top_k(tag_scores(model, X), k)
+    return encoder.classes_[idx], scores
+
+
+def predicted_mask(scores, threshold=TAG_THRESHOLD):
+    """Tags predicted per row: those scoring above threshold, or the best one when none does."""
+    mask = scores > threshold
+    empty = np.flatnonzero(~mask.any(axis=1))
+    mask[empty, scores[empty].argmax(axis=1)] = True
+    return mask
+
+
+def predicted_tags(tags, scores, threshold=TAG_THRESHOLD):
+    """The predicted_mask tags of each row joined into one string; tags and scores best first."""
+    mask = predicted_mask(scores, threshold)
+    joined = tags[:, 0].astype(object)
+    # Best first, so a row's predicted tags are a prefix: one pass per column, not per row.
+    for j in range(1, tags.shape[1]):
+        joined = np.where(mask[:, j], joined + f"{TAG_SEPARATOR} " + tags[:, j].astype(object), joined)
+    return joined
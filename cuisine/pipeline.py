@@ -0,0 +1,203 @@
+import hashlib
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from cuisine import features as derived
+from cuisine import geo, multilabel, text
+
+# ---------------------------------
+# Schema
+# ---------------------------------
+TARGET_COLUMN = "Cuisines"
+MISSING_LABEL = "Unknown"
+RANDOM_STATE = 42
+
+BINARY_COLS = ["Has Online delivery", "Has Table booking"]
+BINARY_MAP = {"Yes": 1, "No": 0}
+
+POSSIBLE_FEATURES = [
+    derived.COST_USD,
+    "Price range",
+    "Has Online delivery",
+    "Has Table booking",
+    "Votes",
+    derived.COUNTRY_COLUMN,
+    derived.CITY_COLUMN,
+]
+
+
+# ---------------------------------
+# Dataset fingerprint
+# ---------------------------------
+def dataset_fingerprint(df):
+    """Content hash of a raw dataset, computed once per load and used as a cache key."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+# ---------------------------------
+# Preprocessing
+# ---------------------------------
+@dataclass
+class Preprocessed:
+    features: list
+    X: np.ndarray
+    y: np.ndarray
+    encoder: LabelEncoder
+    train_idx: np.ndarray
+    test_idx: np.ndarray
+    feature_stats: dict = field(default_factory=dict)
+    multilabel: bool = False
+    vocabularies: dict = field(default_factory=dict)
+    name_features: bool = False
+    geo_index: geo.GeoIndex = None
+
+    @property
+    def X_train(self):
+        return self.X[self.train_idx]
+
+    @property
+    def X_test(self):
+        return self.X[self.test_idx]
+
+    @property
+    def y_train(self):
+        return self.y[self.train_idx]
+
+    @property
+    def y_test(self):
+        return self.y[self.test_idx]
+
+
+def select_features(columns):
+    return [col for col in POSSIBLE_FEATURES if derived.is_available(col, columns)]
+
+
+def encode_features(df, features, vocabularies=None, geo_index=None):
+    """Build the numeric feature matrix column by column, without copying the frame.
+
+    Derived features missing from df are computed from their source columns;
+    categorical features become codes into vocabularies, and neighbourhood
+    features are looked up in geo_index.
+    """
+    vocabularies = vocabularies or {}
+    X = np.empty((len(df), len(features)), dtype=np.float64)
+    nearby = None
+    if geo_index is not None and any(geo.is_nearby(col) for col in features):
+        nearby = dict(zip(geo_index.columns, geo.nearby_features(geo_index, df).T))
+    for j, col in enumerate(features):
+        if nearby is not None and col in nearby:
+            X[:, j] = nearby[col]
+            continue
+        values = derived.column_values(df, col)
+        if col in vocabularies:
+            X[:, j] = derived.category_codes(values, vocabularies[col])
+            continue
+        if col in BINARY_COLS and not pd.api.types.is_numeric_dtype(values):
+            values = values.map(BINARY_MAP)
+        X[:, j] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return X
+
+
+def model_inputs(df, features, vocabularies=None, name_features=False, geo_index=None):
+    """The matrix a model takes: encoded features, plus hashed names as sparse rows if asked."""
+    X = encode_features(df, features, vocabularies, geo_index)
+    if not name_features:
+        return X
+    return text.record_matrix(df[text.NAME_COLUMN], X, features)
+
+
+def input_columns(features, name_features=False):
+    """Raw columns model_inputs reads."""
+    columns = derived.input_columns([col for col in features if not geo.is_nearby(col)])
+    if any(geo.is_nearby(col) for col in features):
+        columns += geo.COORDINATES
+    return columns + [text.NAME_COLUMN] if name_features else columns
+
+
+def encode_target(values):
+    """Label-encode the target, reusing category codes when the column is categorical."""
+    le = LabelEncoder()
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return le, le.fit_transform(values.fillna(MISSING_LABEL))
+
+    if values.hasnans:
+        if MISSING_LABEL not in values.cat.categories:
+            values = values.cat.add_categories([MISSING_LABEL])
+        values = values.fillna(MISSING_LABEL)
+    values = values.cat.remove_unused_categories()
+    classes = np.sort(values.cat.categories.to_numpy(dtype=object))
+    le.classes_ = classes
+    return le, values.cat.set_categories(classes).cat.codes.to_numpy(dtype=np.int64)
+
+
+def preprocess(df, test_size, random_state=RANDOM_STATE, multilabel_target=False,
+               name_features=False, geo_features=False):
+    """Encode features and target once and split by row index.
+
+    With multilabel_target the Cuisines strings are split into individual tags
+    and y is a sparse (rows x tags) indicator matrix instead of class codes.
+    With geo_features a GeoIndex is fitted on the training rows and its
+    neighbourhood columns are appended to the features. With name_features X
+    is the sparse hashed name and feature matrix of cuisine.text;
+    feature_stats still describe the encoded features.
+    """
+    features = select_features(df.columns)
+    vocabularies = derived.fit_vocabularies(df, features)
+    X = encode_features(df, features, vocabularies)
+
+    if multilabel_target:
+        le, y = multilabel.encode_tags(df[TARGET_COLUMN], MISSING_LABEL)
+    else:
+        le, y = encode_target(df[TARGET_COLUMN])
+
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=test_size, random_state=random_state
+    )
+
+    feature_stats = {
+        col: {
+            "min": float(np.nanmin(X[:, j])),
+            "max": float(np.nanmax(X[:, j])),
+            "mean": float(np.nanmean(X[:, j])),
+        }
+        for j, col in enumerate(features)
+    }
+    # A mean code is meaningless; categorical inputs default to the commonest value.
+    for j, col in enumerate(features):
+        if col in vocabularies:
+            codes = X[:, j][~np.isnan(X[:, j])].astype(np.int64)
+            feature_stats[col]["mode"] = vocabularies[col][np.bincount(codes).argmax()]
+
+    geo_index = None
+    if geo_features and geo.is_available(df.columns):
+        if multilabel_target:
+            tag_encoder, tags = le, y
+        else:
+            tag_encoder, tags = multilabel.encode_tags(df[TARGET_COLUMN], MISSING_LABEL)
+        geo_index = geo.fit_index(df, train_idx, tags, tag_encoder.classes_, exclude_tags=[MISSING_LABEL])
+        X = np.hstack([X, geo.training_features(geo_index, df, train_idx)])
+        features = features + geo_index.columns
+    if name_features:
+        X = text.record_matrix(df[text.NAME_COLUMN], X, features)
+
+    return Preprocessed(
+        features=features,
+        X=X,
+        y=y,
+        encoder=le,
+        train_idx=train_idx,
+        test_idx=test_idx,
+        feature_stats=feature_stats,
+        multilabel=multilabel_target,
+        vocabularies=vocabularies,
+        name_features=name_features,
+        geo_index=geo_index,
+    )
@@ -0,0 +1,196 @@
+"""Column profile of a dataset, computed once per dataset version.
+
+The Data Overview tab shows null counts, dtypes, cardinalities and value
+distributions. DatasetProfile holds all of them as small tables, so the tab
+renders without touching the full frame. It is cached on disk next to the
+Feather cache, keyed on the dataset fingerprint.
+
+Distinct counts come from a HyperLogLog sketch: fixed memory per column and
+about 1% error whatever the row count. Frames with more than max_rows rows
+are profiled from a uniform sample, with counts scaled up to the full frame.
+"""
+import os
+
+from dataclasses import dataclass, field
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from cuisine.files import atomic_write
+
+# Bump when the profile's contents change so cached profiles are rebuilt.
+PROFILE_VERSION = 1
+DEFAULT_MAX_ROWS = 1_000_000
+HEAD_ROWS = 10
+HISTOGRAM_BINS = 20
+TOP_VALUES = 20
+# 2**14 one-byte registers: 16 KB per column, ~0.8% standard error.
+HLL_PRECISION = 14
+
+
+# ---------------------------------
+# HyperLogLog
+# ---------------------------------
+def bit_length(values):
+    """Number of significant bits of each uint64, without a Python-level loop."""
+    values = values.copy()
+    length = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= (np.uint64(1) << np.uint64(shift))
+        length += high * shift
+        values = np.where(high, values >> np.uint64(shift), values)
+    return length + (values > 0)
+
+
+class HyperLogLog:
+    """Approximate distinct counter over 64-bit hashes; sketches of chunks merge by max."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        rank = (rest_bits - bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting over empty registers is more accurate.
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+def distinct_estimate(values):
+    """HyperLogLog estimate of the number of distinct non-null values."""
+    hashes = pd.util.hash_pandas_object(values.dropna(), index=False).to_numpy()
+    return HyperLogLog().add(hashes).estimate()
+
+
+# ---------------------------------
+# Profile
+# ---------------------------------
+@dataclass
+class DatasetProfile:
+    n_rows: int
+    columns: pd.DataFrame
+    histograms: dict = field(default_factory=dict)
+    head: pd.DataFrame = None
+    sample_rows: int = None
+    data_hash: str = None
+    version: int = PROFILE_VERSION
+
+    @property
+    def sampled(self):
+        return self.sample_rows is not None
+
+    def distinct(self, col):
+        """Exact category count where the column has one, else the HyperLogLog estimate."""
+        row = self.columns.set_index("Column").loc[col]
+        return int(row["Categories"]) if pd.notna(row["Categories"]) else int(row["Distinct (≈)"])
+
+
+def histogram(values, scale=1.0):
+    """Value distribution of one column: top categories, or equal-width bins of numbers."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        counts = np.bincount(values.cat.codes.to_numpy()[values.notna().to_numpy()],
+                             minlength=len(values.cat.categories))
+        top = np.argsort(-counts, kind="stable")[:TOP_VALUES]
+        labels = values.cat.categories.to_numpy()[top].astype(str)
+        counts = counts[top]
+    elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        numbers = numbers[np.isfinite(numbers)]
+        if not len(numbers):
+            return None
+        counts, edges = np.histogram(numbers, bins=HISTOGRAM_BINS)
+        labels = [f"{low:,.4g} – {high:,.4g}" for low, high in zip(edges[:-1], edges[1:])]
+    else:
+        counts = values.value_counts(sort=True).head(TOP_VALUES)
+        labels = counts.index.astype(str)
+        counts = counts.to_numpy()
+    return pd.DataFrame({"Value": labels, "Count": np.rint(counts * scale).astype(np.int64)})
+
+
+def profile_frame(df, max_rows=DEFAULT_MAX_ROWS, seed=0, data_hash=None):
+    """DatasetProfile of df, from a uniform sample of max_rows rows when df is larger."""
+    n_rows = len(df)
+    sample_rows = None
+    sample = df
+    if max_rows is not None and n_rows > max_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(n_rows, max_rows, replace=False))
+        sample = df.take(rows)
+        sample_rows = max_rows
+    scale = n_rows / len(sample) if len(sample) else 1.0
+
+    columns = pd.DataFrame({
+        "Column": df.columns,
+        "Type": df.dtypes.astype(str).to_numpy(),
+        "Missing": np.rint(sample.isna().sum().to_numpy() * scale).astype(np.int64),
+        # Categories are built from the data, so their count is exact and free.
+        "Categories": [
+            len(df[col].cat.categories) if isinstance(df[col].dtype, pd.CategoricalDtype) else None
+            for col in df.columns
+        ],
+        "Distinct (≈)": [distinct_estimate(sample[col]) for col in df.columns],
+    })
+    columns["Categories"] = columns["Categories"].astype("Int64")
+
+    histograms = {}
+    for col in df.columns:
+        hist = histogram(sample[col], scale)
+        if hist is not None:
+            histograms[col] = hist
+
+    return DatasetProfile(
+        n_rows=n_rows,
+        columns=columns,
+        histograms=histograms,
+        head=df.head(HEAD_ROWS).copy(),
+        sample_rows=sample_rows,
+        data_hash=data_hash,
+    )
+
+
+# ---------------------------------
+# On-disk cache
+# ---------------------------------
+def profile_path(path):
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, f".{name}.profile.joblib")
+
+
+def cached_profile(path, df, data_hash, max_rows=DEFAULT_MAX_ROWS):
+    """Profile of df (loaded from path), reusing the one saved next to path for this data_hash."""
+    cache_file = profile_path(path)
+    try:
+        cached = joblib.load(cache_file)
+    except (OSError, EOFError, ValueError):
+        cached = None
+    if (
+        isinstance(cached, DatasetProfile)
+        and cached.data_hash == data_hash
+        and cached.version == PROFILE_VERSION
+    ):
+        return cached
+
+    profile = profile_frame(df, max_rows=max_rows, data_hash=data_hash)
+    try:
+        atomic_write(cache_file, lambda tmp_path: joblib.dump(profile, tmp_path))
+    except OSError:
+        # Read-only data directory: the in-process cache still saves the work.
+        pass
+    return profile
@@ -0,0 +1,328 @@
+"""Cuisine prediction over HTTP, with concurrent requests coalesced into micro-batches.
+
+    python -m cuisine.serve --port 8000
+
+    python -m cuisine.serve --port 8000 --top-k 3 --min-confidence 0.2
+
+    POST /predict  {"Average Cost for two": 1100, "Price range": 3, ...}
+                   or a JSON list of such objects
+    GET  /health
+
+With --top-k each result also lists the k likeliest cuisines; a result whose
+best probability is under --min-confidence has cuisine null ("abstained").
+
+`app` is a plain ASGI application; running it from the command line needs
+uvicorn, but it can be driven directly by any ASGI client in tests.
+"""
+import argparse
+import asyncio
+import json
+import math
+import numbers
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cuisine import pipeline, text
+from cuisine.batch import (
+    PREDICTION_COLUMN, TOP_LABEL_COLUMN, TOP_PROBABILITY_COLUMN, load_entry, prediction_columns,
+    prediction_model,
+)
+
+
+# ---------------------------------
+# Predictor
+# ---------------------------------
+class Predictor:
+    def __init__(self, model, encoder, features, vocabularies=None, name_features=False, geo_index=None,
+                 top_k=0, min_confidence=None):
+        self.model = model
+        self.encoder = encoder
+        self.features = list(features)
+        self.vocabularies = vocabularies or {}
+        self.name_features = name_features
+        self.geo_index = geo_index
+        self.top_k = top_k
+        self.min_confidence = min_confidence
+        # Records carry raw columns; derived features are computed from them.
+        self.inputs = pipeline.input_columns(self.features, name_features)
+        # Free-text columns; every other input is read as a number.
+        self.text_inputs = {text.NAME_COLUMN} | {
+            col for col, categories in self.vocabularies.items()
+            if not pd.api.types.is_numeric_dtype(np.asarray(categories))
+        }
+
+    @classmethod
+    def from_store(cls, store_dir, key=None, exact=False, top_k=0, min_confidence=None):
+        entry = load_entry(store_dir, key)
+        features = entry.get("features") or pipeline.POSSIBLE_FEATURES
+        return cls(
+            prediction_model(entry, exact), entry["encoder"], features,
+            entry.get("vocabularies"), entry.get("name_features", False), entry.get("geo_index"),
+            top_k, min_confidence
+        )
+
+    def validate(self, record):
+        if not isinstance(record, dict):
+            raise ValueError("each record must be a JSON object")
+        missing = [col for col in self.inputs if col not in record]
+        if missing:
+            raise ValueError(f"missing features: {', '.join(missing)}")
+        for col in self.inputs:
+            record[col] = self.coerce(col, record[col])
+
+    def coerce(self, col, value):
+        """value as predict_records reads it; ValueError if it cannot be."""
+        if value is None:
+            return value
+        if col in self.text_inputs:
+            if isinstance(value, str):
+                return value
+            raise ValueError(f"{col} must be a string, got {value!r}")
+        if col in pipeline.BINARY_COLS and isinstance(value, str) and value in pipeline.BINARY_MAP:
+            return pipeline.BINARY_MAP[value]
+        number = None
+        if isinstance(value, numbers.Real):
+            number = value
+        elif isinstance(value, str):
+            try:
+                number = float(value)
+            except ValueError:
+                pass
+        if number is None or not math.isfinite(number):
+            raise ValueError(f"{col} must be a finite number, got {value!r}")
+        return number
+
+    def predict_records(self, records):
+        """One predict_proba call for a list of records; returns a result dict per record."""
+        df = pd.DataFrame.from_records(records, columns=self.inputs)
+        X = pipeline.model_inputs(df, self.features, self.vocabularies, self.name_features, self.geo_index)
+        columns = prediction_columns(self.model, self.encoder, X, max(self.top_k, 1), self.min_confidence)
+        # Fewer than asked when the model knows fewer classes.
+        k = sum(TOP_LABEL_COLUMN.format(i + 1) in columns for i in range(max(self.top_k, 1)))
+        labels = [columns[TOP_LABEL_COLUMN.format(i + 1)].tolist() for i in range(k)]
+        proba = [columns[TOP_PROBABILITY_COLUMN.format(i + 1)].tolist() for i in range(k)]
+        results = [
+            {"cuisine": None if cuisine is None else str(cuisine), "probability": p}
+            for cuisine, p in zip(columns[PREDICTION_COLUMN].tolist(), proba[0])
+        ]
+        if self.top_k:
+            for row, result in enumerate(results):
+                result["top_k"] = [
+                    {"cuisine": str(labels[i][row]), "probability": proba[i][row]} for i in range(k)
+                ]
+        return results
+
+
+# ---------------------------------
+# Micro-batching
+# ---------------------------------
+class MicroBatcher:
+    """Collects records submitted concurrently and predicts them together.
+
+    A batch is flushed once it holds max_batch_size records or max_wait_ms after
+    its first record arrived. Prediction runs in a worker thread, so requests
+    keep queueing (and forming the next batch) while a batch is being scored.
+    """
+
+    def __init__(self, predict_records, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_records = predict_records
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.records = 0
+
+    def start(self):
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, record):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((record, future))
+        return await future
+
+    async def next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Anything that queued up meanwhile rides along without further waiting.
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def predict_each(self, records):
+        """Results of records predicted one at a time; a record that fails gets its exception."""
+        loop = asyncio.get_running_loop()
+        results = []
+        for record in records:
+            try:
+                results.append((await loop.run_in_executor(None, self.predict_records, [record]))[0])
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            records = [record for record, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.predict_records, records)
+            except Exception as exc:
+                # One bad record must not fail the others batched with it.
+                results = [exc] if len(records) == 1 else await self.predict_each(records)
+            self.batches += 1
+            self.records += len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+# ---------------------------------
+# ASGI application
+# ---------------------------------
+class PredictionApp:
+    def __init__(self, predictor, max_batch_size=64, max_wait_ms=2.0):
+        self.predictor = predictor
+        self.batcher = MicroBatcher(predictor.predict_records, max_batch_size, max_wait_ms)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.batcher.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.batcher.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope, receive, send):
+        method, path = scope["method"], scope["path"]
+        if path == "/health" and method == "GET":
+            await respond(send, 200, {
+                "status": "ok",
+                "batches": self.batcher.batches,
+                "records": self.batcher.records,
+            })
+        elif path == "/predict" and method == "POST":
+            await self.predict(receive, send)
+        elif path in ("/health", "/predict"):
+            await respond(send, 405, {"error": "method not allowed"})
+        else:
+            await respond(send, 404, {"error": "not found"})
+
+    async def predict(self, receive, send):
+        try:
+            payload = json.loads(await read_body(receive) or b"null")
+            records = payload if isinstance(payload, list) else [payload]
+            for record in records:
+                self.predictor.validate(record)
+        except ValueError as exc:
+            await respond(send, 400, {"error": str(exc)})
+            return
+
+        try:
+            results = await asyncio.gather(*(self.batcher.submit(record) for record in records))
+        except Exception as exc:
+            await respond(send, 500, {"error": f"prediction failed: {exc}"})
+            return
+        await respond(send, 200, results if isinstance(payload, list) else results[0])
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def respond(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_app(store_dir=None, key=None, max_batch_size=64, max_wait_ms=2.0, exact=False,
+               top_k=0, min_confidence=None):
+    store_dir = store_dir or os.environ.get("CUISINE_MODEL_STORE", ".model_store")
+    predictor = Predictor.from_store(store_dir, key, exact, top_k, min_confidence)
+    return PredictionApp(predictor, max_batch_size, max_wait_ms)
+
+
+# ---------------------------------
+# CLI
+# ---------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve cuisine predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--store", default=os.environ.get("CUISINE_MODEL_STORE", ".model_store"))
+    parser.add_argument("--key", help="model store key (default: most recently used model)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--exact", action="store_true",
+                        help="predict with the full forest instead of its compact copy")
+    parser.add_argument("--top-k", type=int, default=0,
+                        help="also return the k likeliest cuisines and their probabilities")
+    parser.add_argument("--min-confidence", type=float,
+                        help="return no cuisine when the best probability is below this")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.exit(1, "error: serving over HTTP needs uvicorn (pip install uvicorn)\n")
+
+    try:
+        app = create_app(args.store, args.key, args.max_batch_size, args.max_wait_ms, args.exact,
+                         args.top_k, args.min_confidence)
+    except LookupError as exc:
+        parser.exit(1, f"error: {exc}\n")
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Synthetic restaurants shaped like Dataset.csv, for scale testing.
+
+    python -m cuisine.synthetic restaurants.csv --rows 10000000
+    python -m cuisine.synthetic restaurants.parquet --rows 50000000 --chunksize 1000000
+
+A Profile is learned from the real file:
+- Average Cost for two follows each currency's own distribution.
+- Price range is conditioned on currency and where the cost falls within it.
+- The booking/delivery flags are conditioned on currency and price range.
+- Votes follow a log-scale distribution per price range.
+- Ratings depend on the number of votes.
+- Names and cuisine combinations are drawn together, per currency.
+- Locations are real ones with a small jitter.
+
+Rows are generated and written one chunk at a time, so memory is bounded by
+the chunk size whatever the row count.
+"""
+import argparse
+import sys
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from cuisine import batch
+
+COLUMNS = [
+    "Restaurant ID", "Restaurant Name", "Country Code", "City", "Address",
+    "Locality", "Locality Verbose", "Longitude", "Latitude", "Cuisines",
+    "Average Cost for two", "Currency", "Has Table booking", "Has Online delivery",
+    "Is delivering now", "Switch to order menu", "Price range", "Aggregate rating",
+    "Rating color", "Rating text", "Votes",
+]
+LOCATION_COLUMNS = [
+    "Country Code", "City", "Address", "Locality", "Locality Verbose", "Longitude", "Latitude",
+]
+FLAG_COLUMNS = ["Has Table booking", "Has Online delivery", "Is delivering now", "Switch to order menu"]
+PRICE_RANGES = np.arange(1, 5)
+
+N_QUANTILES = 101
+COST_BINS = 10
+VOTE_EDGES = np.array([1, 5, 25, 100, 500, 2000])
+COST_STEPS = (10000, 5000, 1000, 500, 100, 50, 10, 5, 1)
+# Degrees; a few hundred metres, so points stay in their locality.
+LOCATION_JITTER = 0.002
+DEFAULT_CHUNKSIZE = 500_000
+
+
+# ---------------------------------
+# Profile
+# ---------------------------------
+@dataclass
+class Profile:
+    currencies: np.ndarray
+    locations: pd.DataFrame
+    location_currency: np.ndarray
+    cost_quantiles: np.ndarray
+    cost_step: np.ndarray
+    price_cdf: np.ndarray
+    flag_rates: np.ndarray
+    vote_quantiles: np.ndarray
+    rating_pools: list
+    rating_labels: pd.DataFrame
+    offerings: pd.DataFrame
+    offering_pools: list
+    next_id: int
+
+
+def cost_step(costs):
+    """Largest round step that nearly all of a currency's prices are multiples of."""
+    for step in COST_STEPS:
+        if np.mean(costs % step == 0) >= 0.9:
+            return step
+    return 1
+
+
+def category_cdf(codes, n_categories, fallback=None):
+    counts = np.bincount(codes, minlength=n_categories).astype(float)
+    if counts.sum() == 0:
+        counts = fallback if fallback is not None else np.ones(n_categories)
+    return np.cumsum(counts / counts.sum())
+
+
+def fit_profile(df):
+    """Learn the distributions synthetic rows are drawn from."""
+    df = df.reset_index(drop=True)
+    currency = df["Currency"].astype("category")
+    currencies = currency.cat.categories.to_numpy(dtype=object)
+    currency_codes = currency.cat.codes.to_numpy()
+    n_currencies = len(currencies)
+
+    cost = df["Average Cost for two"].to_numpy()
+    price = df["Price range"].to_numpy()
+    probs = np.linspace(0, 1, N_QUANTILES)
+
+    cost_quantiles = np.empty((n_currencies, N_QUANTILES))
+    steps = np.empty(n_currencies, dtype=np.int64)
+    price_cdf = np.empty((n_currencies, COST_BINS, len(PRICE_RANGES)))
+    flag_rates = np.empty((len(FLAG_COLUMNS), n_currencies, len(PRICE_RANGES)))
+    flags = np.stack([(df[col] == "Yes").to_numpy() for col in FLAG_COLUMNS])
+
+    for c in range(n_currencies):
+        rows = np.flatnonzero(currency_codes == c)
+        costs = cost[rows]
+        cost_quantiles[c] = np.quantile(costs, probs)
+        steps[c] = cost_step(costs)
+
+        # Where each row's cost sits within its currency, as a decile.
+        position = (pd.Series(costs).rank(method="average", pct=True).to_numpy() - 0.5 / len(rows))
+        cost_bin = np.minimum((position * COST_BINS).astype(int), COST_BINS - 1)
+        overall = np.bincount(price[rows] - 1, minlength=len(PRICE_RANGES)).astype(float)
+        for b in range(COST_BINS):
+            price_cdf[c, b] = category_cdf(price[rows][cost_bin == b] - 1, len(PRICE_RANGES), overall)
+
+        currency_rate = flags[:, rows].mean(axis=1)
+        for p in PRICE_RANGES:
+            in_range = rows[price[rows] == p]
+            flag_rates[:, c, p - 1] = flags[:, in_range].mean(axis=1) if len(in_range) else currency_rate
+
+    log_votes = np.log1p(df["Votes"].to_numpy())
+    vote_quantiles = np.stack([
+        np.quantile(log_votes[price == p] if np.any(price == p) else log_votes, probs)
+        for p in PRICE_RANGES
+    ])
+
+    vote_bins = np.digitize(df["Votes"].to_numpy(), VOTE_EDGES)
+    ratings = df["Aggregate rating"].to_numpy()
+    rating_pools = [ratings[vote_bins == b] for b in range(len(VOTE_EDGES) + 1)]
+    rating_labels = (
+        df.groupby("Aggregate rating")[["Rating color", "Rating text"]]
+        .agg(lambda s: s.mode().iloc[0])
+    )
+
+    return Profile(
+        currencies=currencies,
+        locations=df[LOCATION_COLUMNS],
+        location_currency=currency_codes,
+        cost_quantiles=cost_quantiles,
+        cost_step=steps,
+        price_cdf=price_cdf,
+        flag_rates=flag_rates,
+        vote_quantiles=vote_quantiles,
+        rating_pools=rating_pools,
+        rating_labels=rating_labels,
+        offerings=df[["Restaurant Name", "Cuisines"]],
+        offering_pools=[np.flatnonzero(currency_codes == c) for c in range(n_currencies)],
+        next_id=int(df["Restaurant ID"].max()) + 1,
+    )
+
+
+# ---------------------------------
+# Generation
+# ---------------------------------
+def draw_categorical(cdf, rng):
+    """One draw per row from per-row cumulative probabilities (rows x categories)."""
+    r = rng.random(len(cdf))[:, None]
+    return np.minimum((r > cdf).sum(axis=1), cdf.shape[1] - 1)
+
+
+def generate_chunk(profile, n, rng, start_id):
+    # Location, country and currency come from one real restaurant.
+    source = rng.integers(len(profile.locations), size=n)
+    out = profile.locations.iloc[source].reset_index(drop=True)
+    known = (out["Longitude"] != 0) | (out["Latitude"] != 0)
+    for col in ("Longitude", "Latitude"):
+        out[col] = out[col] + np.where(known, rng.normal(0, LOCATION_JITTER, n), 0)
+    currency = profile.location_currency[source]
+
+    u = rng.random(n)
+    position = u * (N_QUANTILES - 1)
+    low = np.floor(position).astype(int)
+    high = np.minimum(low + 1, N_QUANTILES - 1)
+    frac = position - low
+    cost = (1 - frac) * profile.cost_quantiles[currency, low] + frac * profile.cost_quantiles[currency, high]
+    step = profile.cost_step[currency]
+    cost = np.maximum(np.rint(cost / step) * step, step).astype(np.int64)
+
+    cost_bin = np.minimum((u * COST_BINS).astype(int), COST_BINS - 1)
+    price = draw_categorical(profile.price_cdf[currency, cost_bin], rng) + 1
+
+    flag_values = {
+        col: np.where(rng.random(n) < profile.flag_rates[i, currency, price - 1], "Yes", "No")
+        for i, col in enumerate(FLAG_COLUMNS)
+    }
+
+    quantiles = profile.vote_quantiles[price - 1]
+    position = rng.random(n) * (N_QUANTILES - 1)
+    low = np.floor(position).astype(int)
+    high = np.minimum(low + 1, N_QUANTILES - 1)
+    frac = position - low
+    rows = np.arange(n)
+    log_votes = (1 - frac) * quantiles[rows, low] + frac * quantiles[rows, high]
+    votes = np.rint(np.expm1(log_votes)).astype(np.int64)
+
+    vote_bins = np.digitize(votes, VOTE_EDGES)
+    rating = np.zeros(n)
+    for b, pool in enumerate(profile.rating_pools):
+        in_bin = np.flatnonzero(vote_bins == b)
+        if len(in_bin) and len(pool):
+            rating[in_bin] = pool[rng.integers(len(pool), size=len(in_bin))]
+    labels = profile.rating_labels.reindex(rating)
+
+    offering = np.empty(n, dtype=np.int64)
+    for c, pool in enumerate(profile.offering_pools):
+        in_currency = np.flatnonzero(currency == c)
+        if len(in_currency):
+            offering[in_currency] = pool[rng.integers(len(pool), size=len(in_currency))]
+    offerings = profile.offerings.iloc[offering]
+
+    out["Restaurant ID"] = np.arange(start_id, start_id + n)
+    out["Restaurant Name"] = offerings["Restaurant Name"].to_numpy()
+    out["Cuisines"] = offerings["Cuisines"].to_numpy()
+    out["Average Cost for two"] = cost
+    out["Currency"] = profile.currencies[currency]
+    for col, values in flag_values.items():
+        out[col] = values
+    out["Price range"] = price
+    out["Aggregate rating"] = rating
+    out["Rating color"] = labels["Rating color"].to_numpy()
+    out["Rating text"] = labels["Rating text"].to_numpy()
+    out["Votes"] = votes
+    return out[COLUMNS]
+
+
+def iter_synthetic(profile, rows, chunksize=DEFAULT_CHUNKSIZE, seed=0):
+    """Yield DataFrames of at most chunksize synthetic rows, rows in total."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        n = min(chunksize, rows - start)
+        yield generate_chunk(profile, n, rng, profile.next_id + start)
+
+
+def write_synthetic(source, dst, rows, chunksize=DEFAULT_CHUNKSIZE, seed=0):
+    """Learn from the source CSV and stream rows synthetic restaurants to dst."""
+    profile = fit_profile(pd.read_csv(source))
+    return batch.write_chunks(iter_synthetic(profile, rows, chunksize, seed), dst)
+
+
+# ---------------------------------
+# CLI
+# ---------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic restaurants shaped like Dataset.csv.")
+    parser.add_argument("output", help="CSV or Parquet file to write")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--source", default="Dataset.csv", help="real dataset to learn distributions from")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = write_synthetic(args.source, args.output, args.rows, args.chunksize, args.seed)
+    print(f"Wrote {rows:,} synthetic restaurants to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Hashed n-gram features from Restaurant Name.
+
+Names like "Domino's Pizza" or "Izakaya Kikufuji" say more about the cuisine
+than cost or votes do. Each name becomes character (2-4, within words) and
+word (1-2) n-grams hashed into a fixed number of buckets, so there is no
+vocabulary to fit or store and memory does not grow with the data. The
+tabular features are hashed alongside as one token per column value, giving
+one sparse row per restaurant for a linear model.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from cuisine import features as derived
+from cuisine import geo
+
+NAME_COLUMN = "Restaurant Name"
+# A linear model keeps a dense weight per class and bucket: ~1.5k cuisine
+# combinations x 2**14 stays near 100 MB, and more buckets barely help accuracy.
+NAME_BUCKETS = 2**14
+TABULAR_BUCKETS = 2**12
+# Distinct names hashed per vectorizer call.
+DEFAULT_CHUNKSIZE = 50_000
+# Continuous columns become one token per power of two instead of per value.
+LOG_BINNED = [derived.COST_USD, "Votes", geo.DISTANCE_FEATURE]
+# Neighbourhood shares (0-1) become one token per tenth.
+SHARE_BINS = 10
+
+# Stateless: nothing is fitted, so the same objects serve training and prediction.
+VECTORIZERS = [
+    HashingVectorizer(analyzer="char_wb", ngram_range=(2, 4), n_features=NAME_BUCKETS,
+                      strip_accents="unicode", alternate_sign=False, norm=None, dtype=np.float32),
+    HashingVectorizer(analyzer="word", ngram_range=(1, 2), n_features=NAME_BUCKETS,
+                      strip_accents="unicode", alternate_sign=False, norm=None, dtype=np.float32),
+]
+
+
+def hash_names(values, chunksize=DEFAULT_CHUNKSIZE):
+    """L2-normalized (rows x NAME_BUCKETS) n-gram counts of each name.
+
+    Chains repeat the same name many times, so each distinct name is hashed
+    once, in chunks, and rows just pick the row of their name.
+    """
+    names = pd.Series(values).astype("category")
+    categories = names.cat.categories.astype(str)
+    codes = names.cat.codes.to_numpy()
+
+    blocks = []
+    for start in range(0, len(categories), chunksize):
+        chunk = categories[start:start + chunksize]
+        blocks.append(sum(vectorizer.transform(chunk) for vectorizer in VECTORIZERS))
+    # Missing names (code -1) map to an empty row appended last.
+    blocks.append(sparse.csr_matrix((1, NAME_BUCKETS), dtype=np.float32))
+    unique = normalize(sparse.vstack(blocks, format="csr"))
+    return unique[np.where(codes < 0, len(categories), codes)]
+
+
+def hash_tabular(X, features):
+    """L2-normalized (rows x TABULAR_BUCKETS) indicator of each encoded feature value.
+
+    Missing values get no token. The bucket depends on the column name, not its
+    position, so rows encoded with the same columns in another order match.
+    """
+    rows, cols = [], []
+    for j, col in enumerate(features):
+        values = X[:, j]
+        known = np.flatnonzero(~np.isnan(values))
+        values = values[known]
+        if col in LOG_BINNED:
+            values = np.log2(1 + np.maximum(values, 0))
+        elif geo.is_nearby(col):
+            values = values * SHARE_BINS
+        salt = np.uint64(zlib.crc32(col.encode()))
+        tokens = np.floor(values).astype(np.int64).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            buckets = (tokens * np.uint64(0x9E3779B97F4A7C15) + salt) % np.uint64(TABULAR_BUCKETS)
+        rows.append(known)
+        cols.append(buckets.astype(np.int64))
+
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(X.shape[0], TABULAR_BUCKETS)
+    )
+    return normalize(matrix)
+
+
+def record_matrix(names, X, features, chunksize=DEFAULT_CHUNKSIZE):
+    """Sparse (rows x NAME_BUCKETS + TABULAR_BUCKETS) name and tabular tokens, equally weighted."""
+    return sparse.hstack([hash_names(names, chunksize), hash_tabular(X, features)], format="csr")
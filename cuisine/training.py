@@ -0,0 +1,196 @@
+import copy
+import math
+
+import numpy as np
+
+from joblib import effective_n_jobs
+from scipy import sparse
+from scipy.special import expit
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble._forest import MAX_INT
+from sklearn.linear_model import SGDClassifier
+from sklearn.multiclass import OneVsRestClassifier
+
+from cuisine.pipeline import RANDOM_STATE
+
+LINEAR_ALPHA = 1e-5
+LINEAR_EPOCHS = 10
+
+
+# ---------------------------------
+# Forest construction
+# ---------------------------------
+def forest_params(n_jobs=None, max_depth=None, max_samples=None, max_features="sqrt"):
+    """Normalize sidebar values: 0 depth and a full sample mean "no cap"."""
+    return {
+        "n_jobs": n_jobs,
+        "max_depth": max_depth or None,
+        "max_samples": max_samples if max_samples and max_samples < 1.0 else None,
+        "max_features": max_features,
+    }
+
+
+def build_forest(n_estimators, random_state=RANDOM_STATE, **params):
+    return RandomForestClassifier(
+        n_estimators=n_estimators, random_state=random_state, **forest_params(**params)
+    )
+
+
+def dense_labels(y):
+    """Forests need a dense target; multi-label indicator matrices are kept sparse until here."""
+    return y.toarray() if sparse.issparse(y) else y
+
+
+# ---------------------------------
+# Training with progress
+# ---------------------------------
+def fit_forest(X, y, n_estimators, progress=None, batch_size=None,
+               random_state=RANDOM_STATE, **params):
+    """Fit a forest, in warm-start increments when progress reporting is wanted."""
+    model = build_forest(n_estimators, random_state=random_state, **params)
+    if progress is None:
+        return model.fit(X, dense_labels(y))
+    return grow_forest(model, X, y, n_estimators, progress=progress, batch_size=batch_size)
+
+
+def grow_forest(model, X, y, n_estimators, progress=None, batch_size=None):
+    """Warm-start model up to n_estimators trees, calling progress(done, total) per batch.
+
+    Trees are seeded from random_state in order, so the result is identical to a
+    single fit with the same parameters.
+    """
+    y = dense_labels(y)
+    done = len(getattr(model, "estimators_", []))
+    if batch_size is None:
+        if progress is None:
+            batch_size = n_estimators
+        else:
+            # Keep every worker busy while still reporting roughly 20 steps.
+            batch_size = max(effective_n_jobs(model.n_jobs), math.ceil(n_estimators / 20))
+
+    model.set_params(warm_start=True)
+    while done < n_estimators:
+        done = min(done + batch_size, n_estimators)
+        model.set_params(n_estimators=done)
+        model.fit(X, y)
+        if progress is not None:
+            progress(done, n_estimators)
+    model.set_params(warm_start=False)
+    return model
+
+
+def resize_forest(model, X, y, n_estimators, progress=None, batch_size=None):
+    """Forest with n_estimators trees that reuses the trees already in model.
+
+    Shrinking takes a prefix of the fitted trees; growing only fits the extra
+    ones on the same training data. model itself is left untouched.
+    """
+    resized = copy.copy(model)
+    resized.estimators_ = list(model.estimators_[:n_estimators])
+    resized.n_estimators = len(resized.estimators_)
+    if n_estimators <= len(model.estimators_):
+        return resized
+    return grow_forest(resized, X, y, n_estimators, progress=progress, batch_size=batch_size)
+
+
+def fit_extra_trees(X, y, start, stop, progress=None, batch_size=None,
+                    random_state=RANDOM_STATE, **params):
+    """Trees start..stop-1 of fit_forest(X, y, stop), as a forest of their own.
+
+    A forest seeds its trees from consecutive draws of random_state, so skipping
+    the first start draws gives exactly the trees a larger fit would add; the
+    fitted forest itself is not needed. merge_forests puts the two together.
+    """
+    if batch_size is None:
+        batch_size = stop - start if progress is None else max(
+            effective_n_jobs(params.get("n_jobs")), math.ceil((stop - start) / 20)
+        )
+    model = None
+    done = start
+    while done < stop:
+        size = min(batch_size, stop - done)
+        seeds = np.random.RandomState(random_state)
+        seeds.randint(MAX_INT, size=done)
+        part = build_forest(size, random_state=seeds, **params).fit(X, dense_labels(y))
+        if model is None:
+            model = part
+        else:
+            model.estimators_.extend(part.estimators_)
+        done += size
+        if progress is not None:
+            progress(done - start, stop - start)
+    model.set_params(n_estimators=len(model.estimators_), random_state=random_state)
+    return model
+
+
+def merge_forests(base, extra):
+    """base with the trees of extra (fitted by fit_extra_trees on the same data) appended."""
+    merged = copy.copy(base)
+    merged.estimators_ = list(base.estimators_) + list(extra.estimators_)
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+# ---------------------------------
+# Linear model over hashed names
+# ---------------------------------
+def fit_linear(X, y, alpha=LINEAR_ALPHA, epochs=LINEAR_EPOCHS, n_jobs=None, random_state=RANDOM_STATE):
+    """Logistic regression fitted by SGD over the sparse rows of cuisine.text.
+
+    Predicting a row is one sparse dot product per class, whatever the size of
+    the training set. Multi-label targets get one binary model per tag.
+    """
+    sgd = SGDClassifier(
+        loss="log_loss", alpha=alpha, max_iter=epochs, tol=None, random_state=random_state, n_jobs=n_jobs
+    )
+    y = dense_labels(y)
+    if y.ndim == 2:
+        return TagLogistic(n_jobs=n_jobs).stack(OneVsRestClassifier(sgd, n_jobs=n_jobs).fit(X, y))
+    return compact_weights(sgd.fit(X, y))
+
+
+def compact_weights(model):
+    """Store coef_ as float32 in column-major order.
+
+    Predicting computes X @ coef_.T; with a row-major coef_ that transpose is
+    copied on every call, which costs far more than the product for one row.
+    """
+    if hasattr(model, "coef_"):
+        model.coef_ = np.asfortranarray(model.coef_, dtype=np.float32)
+    return model
+
+
+class TagLogistic(ClassifierMixin, BaseEstimator):
+    """The per-tag models of a one-vs-rest logistic regression, stacked into one weight matrix.
+
+    predict_proba returns the (rows x tags) probability of each tag from one
+    sparse product, where the one-vs-rest model calls every tag's model in turn.
+    """
+
+    # Decision value of tags that were always or never present in training.
+    CONSTANT_LOGIT = 30.0
+
+    def __init__(self, n_jobs=None):
+        self.n_jobs = n_jobs
+
+    def stack(self, ovr):
+        coef = np.zeros((len(ovr.estimators_), ovr.n_features_in_), dtype=np.float32)
+        intercept = np.zeros(len(ovr.estimators_))
+        for j, estimator in enumerate(ovr.estimators_):
+            if hasattr(estimator, "coef_"):
+                coef[j] = estimator.coef_[0]
+                intercept[j] = estimator.intercept_[0]
+            else:
+                intercept[j] = self.CONSTANT_LOGIT if estimator.y_[0] else -self.CONSTANT_LOGIT
+        self.coef_ = np.asfortranarray(coef)
+        self.intercept_ = intercept
+        self.classes_ = ovr.classes_
+        self.n_features_in_ = ovr.n_features_in_
+        return self
+
+    def predict_proba(self, X):
+        return expit(np.asarray(X @ self.coef_.T) + self.intercept_)
+
+    def predict(self, X):
+        return (self.predict_proba(X) > 0.5).astype(np.int64)
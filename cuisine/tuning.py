@@ -0,0 +1,231 @@
+"""Hyperparameter sweeps: k-fold cross-validation over a grid or random sample.
+
+Features and target are encoded once; every configuration and fold indexes
+into the same arrays, which each worker process receives a single time.
+Successive halving scores all configurations on one fold, keeps the best
+1/eta and gives the survivors more folds, so poor settings are dropped early.
+Fold scores are cached on disk, so repeated or extended sweeps only fit what
+is new.
+"""
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from sklearn.model_selection import KFold, train_test_split
+
+from cuisine import training
+from cuisine.files import atomic_write_text
+from cuisine.jobs import detached_main
+from cuisine.model_store import ModelStore
+from cuisine.pipeline import RANDOM_STATE
+
+DEFAULT_FOLDS = 3
+DEFAULT_ETA = 3
+# Each worker holds its own forest over ~1.8k cuisine classes; an unlimited
+# depth one alone can take several GB, so only a couple are fitted at once.
+DEFAULT_MAX_WORKERS = 2
+SPACE_KEYS = ("n_estimators", "max_depth", "max_features", "test_size")
+
+
+# ---------------------------------
+# Search spaces
+# ---------------------------------
+def grid_configs(space):
+    """Every combination of the values listed per hyperparameter."""
+    keys = [key for key in SPACE_KEYS if key in space]
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def random_configs(space, n_iter, random_state=RANDOM_STATE):
+    """n_iter distinct combinations drawn uniformly from the grid."""
+    grid = grid_configs(space)
+    if n_iter >= len(grid):
+        return grid
+    rng = np.random.default_rng(random_state)
+    return [grid[i] for i in sorted(rng.choice(len(grid), size=n_iter, replace=False))]
+
+
+def cv_splits(n_rows, test_size, n_folds, random_state=RANDOM_STATE):
+    """(fit_idx, val_idx) folds over the training rows the app would use for test_size."""
+    train_idx, _ = train_test_split(
+        np.arange(n_rows), test_size=test_size, random_state=random_state
+    )
+    folds = KFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    return [(train_idx[fit], train_idx[val]) for fit, val in folds.split(train_idx)]
+
+
+# ---------------------------------
+# Worker
+# ---------------------------------
+_worker_data = {}
+
+
+def init_worker(X, y, splits):
+    _worker_data.update(X=X, y=y, splits=splits)
+
+
+def score_fold(config, fold):
+    """Validation accuracy of one configuration on one fold; runs in a worker process."""
+    X, y = _worker_data["X"], _worker_data["y"]
+    fit_idx, val_idx = _worker_data["splits"][config["test_size"]][fold]
+    start = time.perf_counter()
+    model = training.fit_forest(
+        X[fit_idx], y[fit_idx], config["n_estimators"],
+        n_jobs=1, max_depth=config["max_depth"], max_features=config["max_features"]
+    )
+    seconds = time.perf_counter() - start
+    accuracy = model.score(X[val_idx], training.dense_labels(y[val_idx]))
+    return float(accuracy), seconds
+
+
+# ---------------------------------
+# Result cache
+# ---------------------------------
+class ScoreCache:
+    """Fold scores in one JSON file, keyed like the model store."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as fh:
+                self.scores = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            self.scores = {}
+
+    def get(self, key):
+        return self.scores.get(key)
+
+    def put(self, key, accuracy, seconds):
+        self.scores[key] = {"accuracy": accuracy, "seconds": seconds}
+
+    def save(self):
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        atomic_write_text(self.path, json.dumps(self.scores))
+
+
+# ---------------------------------
+# Sweep
+# ---------------------------------
+class Sweep:
+    def __init__(self, X, y, data_hash, features, target="combination", n_folds=DEFAULT_FOLDS,
+                 cache=None, max_workers=None, random_state=RANDOM_STATE):
+        self.X = X
+        self.y = y
+        self.data_hash = data_hash
+        self.features = list(features)
+        self.target = target
+        self.n_folds = n_folds
+        self.cache = cache
+        self.max_workers = max_workers or min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1)
+        self.random_state = random_state
+        self.scores = {}
+        # (config, fold, exception) of fold fits that raised or whose worker died.
+        self.failures = []
+
+    def fold_key(self, config, fold):
+        return ModelStore.make_key(
+            self.data_hash, self.features, config["n_estimators"], config["test_size"],
+            self.random_state, max_depth=config["max_depth"], max_features=config["max_features"],
+            target=self.target, n_folds=self.n_folds, fold=fold,
+        )
+
+    def score_tasks(self, tasks, progress=None):
+        """Score (config index, config, fold) tasks across processes, using the cache first."""
+        pending = []
+        for task in tasks:
+            index, config, fold = task
+            cached = self.cache.get(self.fold_key(config, fold)) if self.cache else None
+            if cached is not None:
+                self.scores[index, fold] = (cached["accuracy"], cached["seconds"])
+            else:
+                pending.append(task)
+        if not pending:
+            return
+
+        splits = {
+            test_size: cv_splits(len(self.X), test_size, self.n_folds, self.random_state)
+            for test_size in {config["test_size"] for _, config, _ in pending}
+        }
+        context = multiprocessing.get_context("spawn")
+        with detached_main(), ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(pending)), mp_context=context,
+            initializer=init_worker, initargs=(self.X, self.y, splits)
+        ) as executor:
+            futures = {
+                executor.submit(score_fold, config, fold): (index, config, fold)
+                for index, config, fold in pending
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index, config, fold = futures[future]
+                try:
+                    accuracy, seconds = future.result()
+                except Exception as exc:
+                    # A worker killed for memory breaks the pool and fails every
+                    # fold still pending; those configurations are left unscored.
+                    self.failures.append((config, fold, exc))
+                    continue
+                self.scores[index, fold] = (accuracy, seconds)
+                if self.cache is not None:
+                    self.cache.put(self.fold_key(config, fold), accuracy, seconds)
+                if progress is not None:
+                    progress(done, len(pending))
+        if self.cache is not None:
+            self.cache.save()
+
+    def mean_score(self, index, n_folds):
+        accuracies = [self.scores[index, fold][0] for fold in range(n_folds) if (index, fold) in self.scores]
+        return np.mean(accuracies) if accuracies else -np.inf
+
+    def run(self, configs, halving=True, eta=DEFAULT_ETA, progress=None):
+        """Cross-validate configs and return the leaderboard, best first.
+
+        progress(rung, done, total) is called as fold fits finish.
+        """
+        self.scores = {}
+        self.failures = []
+        survivors = list(range(len(configs)))
+        rung_folds = 1 if halving else self.n_folds
+        rung = 0
+        while True:
+            tasks = [(i, configs[i], fold) for i in survivors for fold in range(rung_folds)]
+            self.score_tasks(
+                tasks,
+                progress=None if progress is None else lambda done, total: progress(rung, done, total)
+            )
+            if len(survivors) <= 1 or rung_folds >= self.n_folds:
+                break
+            keep = max(1, math.ceil(len(survivors) / eta))
+            survivors = sorted(survivors, key=lambda i: -self.mean_score(i, rung_folds))[:keep]
+            rung_folds = min(self.n_folds, rung_folds * eta)
+            rung += 1
+        return self.leaderboard(configs)
+
+    def leaderboard(self, configs):
+        """Configurations with at least one scored fold, best first."""
+        rows = []
+        for i, config in enumerate(configs):
+            fold_scores = [self.scores[i, fold] for fold in range(self.n_folds) if (i, fold) in self.scores]
+            if not fold_scores:
+                continue
+            accuracies = [accuracy for accuracy, _ in fold_scores]
+            rows.append({
+                **config,
+                "max_depth": config["max_depth"] or None,
+                "Folds": len(fold_scores),
+                "CV Accuracy": np.mean(accuracies),
+                "Std": np.std(accuracies),
+                "Fit Seconds": sum(seconds for _, seconds in fold_scores),
+            })
+        board = pd.DataFrame(rows, columns=[*SPACE_KEYS, "Folds", "CV Accuracy", "Std", "Fit Seconds"])
+        board = board.sort_values(["Folds", "CV Accuracy"], ascending=False)
+        board.insert(0, "Rank", np.arange(1, len(board) + 1))
+        return board.reset_index(drop=True)